@@ -1,13 +1,24 @@
 import os
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
     
-from flask import Flask, redirect, url_for, session, request, Response
+import orjson
+from prometheus_client import CollectorRegistry, Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+from log_handlers import SizeRotatingFileHandler
+from flask import Flask, redirect, url_for, session, request, Response, make_response
+from flask.json.provider import JSONProvider
 from flask_restx import Api, Resource, Namespace, fields, abort
 from authlib.integrations.flask_client import OAuth
 from werkzeug.middleware.proxy_fix import ProxyFix
-from models import db, MLModel, AVAILABLE_MODELS, create_model_record, train_and_log_model, load_model_from_mlflow
-from typing import Dict, Any, List, Tuple, Union, Optional
+from celery.result import AsyncResult
+from models import db, init_db, MLModel, ENGINE_OPTIONS, AVAILABLE_MODELS, get_cached_model, load_model_from_mlflow, lookup_model, evict_model
+from tasks import celery_app, train_task, retrain_task
+from typing import Dict, Any, Tuple, Union, Optional
+import numpy as np
 
 """
 Setting app configurations
@@ -15,31 +26,67 @@ Setting app configurations
 
 # Настройка логгера для Flask приложения
 logger = logging.getLogger('flask_app')
-logger.setLevel(logging.INFO)
-
-# Файловый обработчик
-os.makedirs("logs", exist_ok=True)
-file_handler = RotatingFileHandler(
-    'logs/flask_api.log', 
-    maxBytes=1024 * 1024,  
-    backupCount=10
-)
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+
+# Под gunicorn в один файл писали бы все воркеры, и каждый сам решал бы, когда его ротировать.
+# Поэтому там логи идут в stdout (LOG_TO_STDOUT выставляет gunicorn.conf.py), иначе - в файл
+if os.getenv("LOG_TO_STDOUT"):
+    log_handler: logging.Handler = logging.StreamHandler(sys.stdout)
+else:
+    os.makedirs("logs", exist_ok=True)
+    log_handler = SizeRotatingFileHandler(
+        'logs/flask_api.log', 
+        maxBytes=50 * 1024 * 1024,  
+        backupCount=10
+    )
 formatter = logging.Formatter(
     '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
+log_handler.setFormatter(formatter)
+
+# Запись в файл идет в фоновом потоке, обработчик запроса только кладет запись в очередь
+queue_handler = QueueHandler(queue.Queue(-1))
+logger.addHandler(queue_handler)
+
+def start_log_listener() -> QueueListener:
+    """Запускает поток записи логов. Потоки не переживают fork, поэтому gunicorn вызывает это в каждом воркере"""
+    queue_handler.queue = queue.Queue(-1)
+    listener = QueueListener(queue_handler.queue, log_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+start_log_listener()
+
+# Метрики Prometheus для пути предсказания (дешевле, чем лог на каждый запрос)
+PREDICTION_REQUESTS = Counter('prediction_requests_total', 'Number of prediction requests')
+PREDICTION_DURATION = Histogram('prediction_duration_seconds', 'Prediction request duration in seconds')
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+class OrjsonProvider(JSONProvider):
+    """JSON провайдер Flask на orjson (C парсер вместо стандартного json)"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, option=ORJSON_OPTIONS).decode()
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 app.config['JSON_AS_ASCII'] = False
 app.config['JSON_SORT_KEYS'] = False
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = ENGINE_OPTIONS
 app.secret_key = os.urandom(24)
 app.wsgi_app = ProxyFix(app.wsgi_app)
 
 # Инициализация базы данных
-db.init_app(app)
+init_db(app)
 
 api = Api(
     app, 
@@ -52,6 +99,15 @@ api = Api(
 
 namespace = api.namespace('', 'Click the down arrow to expand the content')
 
+
+@api.representation('application/json')
+def output_json(data: Any, code: int, headers: Optional[Dict[str, str]] = None) -> Response:
+    # Flask-RESTX по умолчанию кодирует ответы через стандартный json
+    resp = make_response(orjson.dumps(data, option=ORJSON_OPTIONS), code)
+    resp.headers.extend(headers or {})
+    resp.mimetype = 'application/json'
+    return resp
+
 """
 Initializing authorization via github
 """
@@ -79,7 +135,7 @@ def registro() -> Response:
     logger.info("Starting OAuth login process")
     github = oauth.create_client('github')
     redirect_uri = url_for('authorize', _external=True)
-    logger.info(f"Redirecting to GitHub OAuth: {redirect_uri}")
+    logger.info("Redirecting to GitHub OAuth: %s", redirect_uri)
     return github.authorize_redirect(redirect_uri)
 
 @app.route('/authorize')
@@ -97,15 +153,35 @@ def authorize() -> Response:
     github_id = profile['id']
     session['token_oauth'] = token
     session['github_id'] = profile['id']
-    logger.info(f"Successful GitHub authorization for user ID: {github_id}")
+    logger.info("Successful GitHub authorization for user ID: %s", github_id)
     return redirect(url_for('index'))
 
+@app.route('/metrics')
+def metrics() -> Response:
+    # Под gunicorn у каждого воркера свои счетчики - собираем их из общего каталога
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
 def get_user_id() -> Optional[int]:
     # вернет ID пользователя или None, если пользователь не авторизован
     if 'github_id' in session:
         return session['github_id']
     return 
 
+# Список доступных моделей статичен - сериализуем его один раз при импорте
+MODELS_INFO = {
+    key: {
+        "class_name": val["class"].__name__,
+        "hyperparameters": val["hyperparameters"],
+        "description": val["description"]
+    }
+    for key, val in AVAILABLE_MODELS.items()
+}
+MODELS_INFO_BYTES = orjson.dumps(MODELS_INFO)
+
 # Swagger models
 train_model = api.model('TrainModel', {
     'model_type': fields.String(required=True, description='Model type (random_forest / logistic_regression)'),
@@ -129,24 +205,16 @@ retrain_model = api.model('RetrainModel', {
 class Health(Resource):
     @api.doc(description="Проверка статуса сервиса")
     def get(self) -> Tuple[Dict[str, str], int]:
-        logger.info("Health check requested")
+        logger.debug("Health check requested")
         return {'status': 'ok'}, 200
 
 
 @namespace.route('/model-classes')
 class ModelClasses(Resource):
     @api.doc(description="List of models available and their parameters")
-    def get(self) -> Tuple[Dict[str, Any], int]:
-        logger.info("Request for available model classes")
-        models_info = {}
-        for key, val in AVAILABLE_MODELS.items():
-            models_info[key] = {
-                "class_name": val["class"].__name__,
-                "hyperparameters": val["hyperparameters"],
-                "description": val["description"]
-            }
-        logger.info(f"Returning {len(models_info)} model classes")
-        return models_info, 200
+    def get(self) -> Response:
+        logger.debug("Request for available model classes")
+        return Response(MODELS_INFO_BYTES, status=200, mimetype='application/json')
 
 @namespace.route('/models/train')
 class TrainModel(Resource):
@@ -160,62 +228,69 @@ class TrainModel(Resource):
         X = data.get('X')
         y = data.get('y')
 
-        logger.info(f"Training model type: {model_type} with {len(X)} samples")
+        logger.info("Training model type: %s with %d samples", model_type, len(X))
 
         if model_type not in AVAILABLE_MODELS:
-            logger.error(f"Unsupported model type: {model_type}")
+            logger.error("Unsupported model type: %s", model_type)
             abort(400, 'Unsupported model type')
 
-        try:
-            # Обучаем, считаем метрики и логируем в MLflow 
-            run_id, metrics, model_uri = train_and_log_model(model_type, params, X, y)
-        except Exception as e:
-            logger.error(f"Training failed: {e}")
-            abort(500, f"Training failed: {str(e)}")
-
-        record = create_model_record(run_id, model_type, params, model_uri, metrics)
-        db.session.add(record)
-        db.session.commit()
-
-        logger.info(f"Model trained successfully. ID: {run_id}, Metrics: {metrics}")
-        return {'model_id': run_id, 'metrics': metrics}, 201
+        # Обучение и логирование в MLflow выполняются в Celery воркере
+        job = train_task.delay(model_type, params, X, y)
+        logger.info("Training job submitted. Job ID: %s", job.id)
+        return {'job_id': job.id}, 202
 
 
 @namespace.route('/models')
 class ListModels(Resource):
     @api.doc(description="Get list of models trained")
-    def get(self) -> Tuple[List[Dict[str, Any]], int]:
-        logger.info("Request for list of all models")
-        models = MLModel.query.all()
-        result = [model.to_dict() for model in models]
-        logger.info(f"Returning {len(result)} models")
-        return result, 200
+    def get(self) -> Response:
+        logger.debug("Request for list of all models")
+        # Берем только нужные для списка колонки, без сборки ORM объектов
+        rows = db.session.execute(
+            db.select(MLModel.id, MLModel.model_type, MLModel.created_at, MLModel.metrics, MLModel.status)
+            .order_by(MLModel.created_at)
+        ).all()
+        # Кодируем сразу в байты, минуя маршалинг Flask-RESTX
+        # (orjson пишет datetime в том же ISO формате, что и isoformat())
+        payload = orjson.dumps([
+            {
+                'id': r.id,
+                'model_type': r.model_type,
+                'created_at': r.created_at,
+                'metrics': r.metrics,
+                'status': r.status
+            }
+            for r in rows
+        ])
+        logger.debug("Returning %d models", len(rows))
+        return Response(payload, status=200, mimetype='application/json')
 
 
 @namespace.route('/models/<string:model_id>')
 class ModelById(Resource):
     @api.doc(description="Get information on a trained model")
     def get(self, model_id: str) -> Tuple[Dict[str, Any], int]:
-        logger.info(f"Request for model info: {model_id}")
-        record = MLModel.query.filter_by(id=model_id).first()
+        logger.debug("Request for model info: %s", model_id)
+        record = db.session.get(MLModel, model_id)
         if not record:
-            logger.warning(f"Model not found: {model_id}")
+            logger.warning("Model not found: %s", model_id)
             abort(404, 'Model not found')
-        logger.info(f"Returning model info: {model_id}")
+        logger.debug("Returning model info: %s", model_id)
         return record.to_dict(), 200
 
     @api.doc(description="Delete model")
     def delete(self, model_id: str) -> Tuple[str, int]:
-        logger.info(f"Request to delete model: {model_id}")
-        record = MLModel.query.filter_by(id=model_id).first()
+        logger.info("Request to delete model: %s", model_id)
+        record = db.session.get(MLModel, model_id)
         if not record:
-            logger.warning(f"Model not found for deletion: {model_id}")
+            logger.warning("Model not found for deletion: %s", model_id)
             abort(404, 'Model not found')
         
         db.session.delete(record)
         db.session.commit()
+        evict_model(record.file_path)
         
-        logger.info(f"Model record deleted successfully: {model_id}")
+        logger.info("Model record deleted successfully: %s", model_id)
         return '', 204
 
 
@@ -223,26 +298,38 @@ class ModelById(Resource):
 class ModelPredict(Resource):
     @api.doc(description="Make prediction")
     @api.expect(predict_model)
-    def post(self, model_id: str) -> Tuple[Dict[str, List[float]], int]:
-        logger.info(f"Prediction request for model: {model_id}")
-        record = MLModel.query.filter_by(id=model_id).first()
-        if not record:
-            logger.warning(f"Model not found for prediction: {model_id}")
+    def post(self, model_id: str) -> Response:
+        PREDICTION_REQUESTS.inc()
+        start = time.perf_counter()
+        try:
+            file_path, _, _, status = lookup_model(model_id)
+        except KeyError:
+            logger.warning("Model not found for prediction: %s", model_id)
             abort(404, 'Model not found')
+        # Модель, обученная в этом процессе, уже в памяти. Иначе ее можно загрузить только из MLflow,
+        # а пока артефакт не загружен - отвечаем сразу, не занимая поток
+        model = get_cached_model(file_path)
+        if model is None and status == 'uploading':
+            abort(503, 'Model is still being uploaded to MLflow, try again later')
+        if model is None and status == 'failed':
+            abort(409, 'Model upload to MLflow failed, retrain the model')
         try:
             # Загружаем модель 
-            model = load_model_from_mlflow(record.file_path)
-            
-            X = request.json.get('X')
-            logger.info(f"Making prediction with {len(X)} samples")
-            
-            preds = model.predict(X).tolist()
-            logger.info(f"Prediction completed. Returning {len(preds)} predictions")
-            return {'predictions': preds}, 200
-            
+            if model is None:
+                model = load_model_from_mlflow(file_path)
+            X_arr = np.asarray(request.json.get('X'), dtype=np.float32)
+            preds = model.predict(X_arr)
+            # orjson кодирует числовой ndarray напрямую из буфера, без .tolist();
+            # object массив (модель обучена на строковых метках) он не кодирует
+            if preds.dtype == object:
+                preds = preds.tolist()
+            payload = orjson.dumps({'predictions': preds}, option=ORJSON_OPTIONS)
         except Exception as e:
-            logger.error(f"Prediction failed: {e}")
+            logger.error("Prediction failed: %s", e)
             abort(500, "Failed to load model or make prediction")
+        PREDICTION_DURATION.observe(time.perf_counter() - start)
+        logger.debug("Predicted n=%d for model %s", len(preds), model_id)
+        return Response(payload, status=200, mimetype='application/json')
 
 
 @namespace.route('/models/<string:model_id>/retrain')
@@ -250,49 +337,45 @@ class ModelRetrain(Resource):
     @api.doc(description="Retrain existing model")
     @api.expect(retrain_model)
     def post(self, model_id: str) -> Tuple[Dict[str, Any], int]:
-        logger.info(f"Retrain request for model: {model_id}")
-        record = MLModel.query.filter_by(id=model_id).first()
+        logger.info("Retrain request for model: %s", model_id)
+        record = db.session.get(MLModel, model_id)
         if not record:
-            logger.warning(f"Model not found for retraining: {model_id}")
+            logger.warning("Model not found for retraining: %s", model_id)
             abort(404, 'Model not found')
         X = request.json.get('X')
         y = request.json.get('y')
-        params = record.params
-        model_type = record.model_type
-        try:
-            new_run_id, metrics, new_model_uri = train_and_log_model(model_type, params, X, y)
-        except Exception as e:
-            logger.error(f"Retraining failed: {e}")
-            abort(500, f"Retraining failed: {str(e)}")
-        db.session.delete(record)
-        new_record = create_model_record(new_run_id, model_type, params, new_model_uri, metrics)
-        db.session.add(new_record)
-        db.session.commit()
-        logger.info(f"Model retrained. Old ID: {model_id}, New ID: {new_run_id}, Metrics: {metrics}")
-        return {
-            'status': 'retrained', 
-            'new_model_id': new_run_id, 
-            'metrics': metrics
-        }, 200
+        job = retrain_task.delay(model_id, X, y)
+        logger.info("Retraining job submitted. Model ID: %s, Job ID: %s", model_id, job.id)
+        return {'job_id': job.id}, 202
+
+
+@namespace.route('/jobs/<string:job_id>')
+class JobStatus(Resource):
+    @api.doc(description="Get status of a training job")
+    def get(self, job_id: str) -> Tuple[Dict[str, Any], int]:
+        logger.debug("Status request for job: %s", job_id)
+        job = AsyncResult(job_id, app=celery_app)
+        response = {'job_id': job_id, 'status': job.state}
+        if job.successful():
+            response['result'] = job.result
+        elif job.failed():
+            response['error'] = str(job.result)
+        return response, 200
 
 
 @namespace.route('/metrics/<string:model_id>')
 class ModelMetrics(Resource):
     @api.doc(description="Get model scores")
     def get(self, model_id: str) -> Tuple[Dict[str, float], int]:
-        logger.info(f"Metrics request for model: {model_id}")
-        record = MLModel.query.filter_by(id=model_id).first()
+        logger.debug("Metrics request for model: %s", model_id)
+        record = db.session.get(MLModel, model_id)
         if not record:
-            logger.warning(f"Model not found for metrics: {model_id}")
+            logger.warning("Model not found for metrics: %s", model_id)
             abort(404, 'Model not found')
-        logger.info(f"Returning metrics for model: {model_id}")
+        logger.debug("Returning metrics for model: %s", model_id)
         return record.metrics, 200   
 
-if __name__ == '__main__':
-    logger.info("Starting Flask application")
-    with app.app_context():
-        db.create_all()
-        logger.info("Database tables created")
-    logger.info("Flask app running in debug mode")
-    # app.run(debug=True)
-    app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
+# Таблицы создаются при импорте: под gunicorn --preload это происходит один раз в master процессе
+with app.app_context():
+    db.create_all()
+    logger.info("Database tables created")
@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\tapp.proto\x12\tmlservice\"\x07\n\x05\x45mpty\"\x0f\n\rHealthRequest\" \n\x0eHealthResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"\xb0\x01\n\x14ModelClassesResponse\x12H\n\rmodel_classes\x18\x01 \x03(\x0b\x32\x31.mlservice.ModelClassesResponse.ModelClassesEntry\x1aN\n\x11ModelClassesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12(\n\x05value\x18\x02 \x01(\x0b\x32\x19.mlservice.ModelClassInfo:\x02\x38\x01\"R\n\x0eModelClassInfo\x12\x12\n\nclass_name\x18\x01 \x01(\t\x12\x17\n\x0fhyperparameters\x18\x02 \x03(\t\x12\x13\n\x0b\x64\x65scription\x18\x03 \x01(\t\"\xb5\x01\n\x0cTrainRequest\x12\x12\n\nmodel_type\x18\x01 \x01(\t\x12\x33\n\x06params\x18\x02 \x03(\x0b\x32#.mlservice.TrainRequest.ParamsEntry\x12\"\n\x01X\x18\x03 \x03(\x0b\x32\x17.mlservice.FeatureArray\x12\t\n\x01y\x18\x04 \x03(\x05\x1a-\n\x0bParamsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\" \n\x0c\x46\x65\x61tureArray\x12\x10\n\x08\x66\x65\x61tures\x18\x01 \x03(\x02\"\x89\x01\n\rTrainResponse\x12\x10\n\x08model_id\x18\x01 \x01(\t\x12\x36\n\x07metrics\x18\x02 \x03(\x0b\x32%.mlservice.TrainResponse.MetricsEntry\x1a.\n\x0cMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02:\x02\x38\x01\"F\n\x0ePredictRequest\x12\x10\n\x08model_id\x18\x01 \x01(\t\x12\"\n\x01X\x18\x02 \x03(\x0b\x32\x17.mlservice.FeatureArray\"&\n\x0fPredictResponse\x12\x13\n\x0bpredictions\x18\x01 \x03(\x02\"\x1b\n\x07ModelId\x12\x10\n\x08model_id\x18\x01 \x01(\t\"Q\n\x0eRetrainRequest\x12\x10\n\x08model_id\x18\x01 \x01(\t\x12\"\n\x01X\x18\x02 \x03(\x0b\x32\x17.mlservice.FeatureArray\x12\t\n\x01y\x18\x03 \x03(\x05\"{\n\x0fRetrainResponse\x12\x38\n\x07metrics\x18\x01 \x03(\x0b\x32\'.mlservice.RetrainResponse.MetricsEntry\x1a.\n\x0cMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02:\x02\x38\x01\"{\n\x0fMetricsResponse\x12\x38\n\x07metrics\x18\x01 \x03(\x0b\x32\'.mlservice.MetricsResponse.MetricsEntry\x1a.\n\x0cMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02:\x02\x38\x01\"\x90\x02\n\rModelResponse\x12\n\n\x02id\x18\x01 \x01(\t\x12\x12\n\nmodel_type\x18\x02 \x01(\t\x12\x34\n\x06params\x18\x03 \x03(\x0b\x32$.mlservice.ModelResponse.ParamsEntry\x12\x12\n\ncreated_at\x18\x04 \x01(\t\x12\x36\n\x07metrics\x18\x05 \x03(\x0b\x32%.mlservice.ModelResponse.MetricsEntry\x1a-\n\x0bParamsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\x1a.\n\x0cMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02:\x02\x38\x01\">\n\x12ListModelsResponse\x12(\n\x06models\x18\x01 \x03(\x0b\x32\x18.mlservice.ModelResponse\"!\n\x0e\x44\x65leteResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x32\xd4\x04\n\tMLService\x12\x42\n\x0bHealthCheck\x12\x18.mlservice.HealthRequest\x1a\x19.mlservice.HealthResponse\x12\x44\n\x0fGetModelClasses\x12\x10.mlservice.Empty\x1a\x1f.mlservice.ModelClassesResponse\x12=\n\nListModels\x12\x10.mlservice.Empty\x1a\x1d.mlservice.ListModelsResponse\x12?\n\nTrainModel\x12\x17.mlservice.TrainRequest\x1a\x18.mlservice.TrainResponse\x12\x38\n\x08GetModel\x12\x12.mlservice.ModelId\x1a\x18.mlservice.ModelResponse\x12<\n\x0b\x44\x65leteModel\x12\x12.mlservice.ModelId\x1a\x19.mlservice.DeleteResponse\x12@\n\x07Predict\x12\x19.mlservice.PredictRequest\x1a\x1a.mlservice.PredictResponse\x12\x45\n\x0cRetrainModel\x12\x19.mlservice.RetrainRequest\x1a\x1a.mlservice.RetrainResponse\x12<\n\nGetMetrics\x12\x12.mlservice.ModelId\x1a\x1a.mlservice.MetricsResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\tapp.proto\x12\tmlservice\"\x07\n\x05\x45mpty\"\x0f\n\rHealthRequest\" \n\x0eHealthResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"\xb0\x01\n\x14ModelClassesResponse\x12H\n\rmodel_classes\x18\x01 \x03(\x0b\x32\x31.mlservice.ModelClassesResponse.ModelClassesEntry\x1aN\n\x11ModelClassesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12(\n\x05value\x18\x02 \x01(\x0b\x32\x19.mlservice.ModelClassInfo:\x02\x38\x01\"R\n\x0eModelClassInfo\x12\x12\n\nclass_name\x18\x01 \x01(\t\x12\x17\n\x0fhyperparameters\x18\x02 \x03(\t\x12\x13\n\x0b\x64\x65scription\x18\x03 \x01(\t\"\xaf\x01\n\x0cTrainRequest\x12\x12\n\nmodel_type\x18\x01 \x01(\t\x12\x33\n\x06params\x18\x02 \x03(\x0b\x32#.mlservice.TrainRequest.ParamsEntry\x12\x1c\n\x01X\x18\x03 \x01(\x0b\x32\x11.mlservice.Matrix\x12\t\n\x01y\x18\x04 \x01(\x0c\x1a-\n\x0bParamsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"2\n\x06Matrix\x12\x0c\n\x04\x64\x61ta\x18\x01 \x01(\x0c\x12\x0c\n\x04rows\x18\x02 \x01(\x05\x12\x0c\n\x04\x63ols\x18\x03 \x01(\x05\"\x89\x01\n\rTrainResponse\x12\x10\n\x08model_id\x18\x01 \x01(\t\x12\x36\n\x07metrics\x18\x02 \x03(\x0b\x32%.mlservice.TrainResponse.MetricsEntry\x1a.\n\x0cMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02:\x02\x38\x01\"@\n\x0ePredictRequest\x12\x10\n\x08model_id\x18\x01 \x01(\t\x12\x1c\n\x01X\x18\x02 \x01(\x0b\x32\x11.mlservice.Matrix\"&\n\x0fPredictResponse\x12\x13\n\x0bpredictions\x18\x01 \x01(\x0c\"\x1b\n\x07ModelId\x12\x10\n\x08model_id\x18\x01 \x01(\t\"K\n\x0eRetrainRequest\x12\x10\n\x08model_id\x18\x01 \x01(\t\x12\x1c\n\x01X\x18\x02 \x01(\x0b\x32\x11.mlservice.Matrix\x12\t\n\x01y\x18\x03 \x01(\x0c\"{\n\x0fRetrainResponse\x12\x38\n\x07metrics\x18\x01 \x03(\x0b\x32\'.mlservice.RetrainResponse.MetricsEntry\x1a.\n\x0cMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02:\x02\x38\x01\"{\n\x0fMetricsResponse\x12\x38\n\x07metrics\x18\x01 \x03(\x0b\x32\'.mlservice.MetricsResponse.MetricsEntry\x1a.\n\x0cMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02:\x02\x38\x01\"\xa0\x02\n\rModelResponse\x12\n\n\x02id\x18\x01 \x01(\t\x12\x12\n\nmodel_type\x18\x02 \x01(\t\x12\x34\n\x06params\x18\x03 \x03(\x0b\x32$.mlservice.ModelResponse.ParamsEntry\x12\x12\n\ncreated_at\x18\x04 \x01(\t\x12\x36\n\x07metrics\x18\x05 \x03(\x0b\x32%.mlservice.ModelResponse.MetricsEntry\x12\x0e\n\x06status\x18\x06 \x01(\t\x1a-\n\x0bParamsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\x1a.\n\x0cMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02:\x02\x38\x01\">\n\x12ListModelsResponse\x12(\n\x06models\x18\x01 \x03(\x0b\x32\x18.mlservice.ModelResponse\"!\n\x0e\x44\x65leteResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\"\x17\n\x05JobId\x12\x0e\n\x06job_id\x18\x01 \x01(\t\"\x1d\n\x0bJobResponse\x12\x0e\n\x06job_id\x18\x01 \x01(\t\"\xc0\x01\n\x11JobStatusResponse\x12\x0e\n\x06job_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x10\n\x08model_id\x18\x03 \x01(\t\x12:\n\x07metrics\x18\x04 \x03(\x0b\x32).mlservice.JobStatusResponse.MetricsEntry\x12\r\n\x05\x65rror\x18\x05 \x01(\t\x1a.\n\x0cMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02:\x02\x38\x01\x32\xd7\x05\n\tMLService\x12\x42\n\x0bHealthCheck\x12\x18.mlservice.HealthRequest\x1a\x19.mlservice.HealthResponse\x12\x44\n\x0fGetModelClasses\x12\x10.mlservice.Empty\x1a\x1f.mlservice.ModelClassesResponse\x12=\n\nListModels\x12\x10.mlservice.Empty\x1a\x1d.mlservice.ListModelsResponse\x12?\n\nTrainModel\x12\x17.mlservice.TrainRequest\x1a\x18.mlservice.TrainResponse\x12\x38\n\x08GetModel\x12\x12.mlservice.ModelId\x1a\x18.mlservice.ModelResponse\x12<\n\x0b\x44\x65leteModel\x12\x12.mlservice.ModelId\x1a\x19.mlservice.DeleteResponse\x12@\n\x07Predict\x12\x19.mlservice.PredictRequest\x1a\x1a.mlservice.PredictResponse\x12\x45\n\x0cRetrainModel\x12\x19.mlservice.RetrainRequest\x1a\x1a.mlservice.RetrainResponse\x12<\n\nGetMetrics\x12\x12.mlservice.ModelId\x1a\x1a.mlservice.MetricsResponse\x12\x41\n\x0eSubmitTrainJob\x12\x17.mlservice.TrainRequest\x1a\x16.mlservice.JobResponse\x12>\n\x0cGetJobStatus\x12\x10.mlservice.JobId\x1a\x1c.mlservice.JobStatusResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -45,6 +45,8 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_MODELRESPONSE_PARAMSENTRY']._serialized_options = b'8\001'
   _globals['_MODELRESPONSE_METRICSENTRY']._loaded_options = None
   _globals['_MODELRESPONSE_METRICSENTRY']._serialized_options = b'8\001'
+  _globals['_JOBSTATUSRESPONSE_METRICSENTRY']._loaded_options = None
+  _globals['_JOBSTATUSRESPONSE_METRICSENTRY']._serialized_options = b'8\001'
   _globals['_EMPTY']._serialized_start=24
   _globals['_EMPTY']._serialized_end=31
   _globals['_HEALTHREQUEST']._serialized_start=33
@@ -58,41 +60,49 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_MODELCLASSINFO']._serialized_start=263
   _globals['_MODELCLASSINFO']._serialized_end=345
   _globals['_TRAINREQUEST']._serialized_start=348
-  _globals['_TRAINREQUEST']._serialized_end=529
-  _globals['_TRAINREQUEST_PARAMSENTRY']._serialized_start=484
-  _globals['_TRAINREQUEST_PARAMSENTRY']._serialized_end=529
-  _globals['_FEATUREARRAY']._serialized_start=531
-  _globals['_FEATUREARRAY']._serialized_end=563
-  _globals['_TRAINRESPONSE']._serialized_start=566
-  _globals['_TRAINRESPONSE']._serialized_end=703
-  _globals['_TRAINRESPONSE_METRICSENTRY']._serialized_start=657
-  _globals['_TRAINRESPONSE_METRICSENTRY']._serialized_end=703
-  _globals['_PREDICTREQUEST']._serialized_start=705
-  _globals['_PREDICTREQUEST']._serialized_end=775
-  _globals['_PREDICTRESPONSE']._serialized_start=777
-  _globals['_PREDICTRESPONSE']._serialized_end=815
-  _globals['_MODELID']._serialized_start=817
-  _globals['_MODELID']._serialized_end=844
-  _globals['_RETRAINREQUEST']._serialized_start=846
+  _globals['_TRAINREQUEST']._serialized_end=523
+  _globals['_TRAINREQUEST_PARAMSENTRY']._serialized_start=478
+  _globals['_TRAINREQUEST_PARAMSENTRY']._serialized_end=523
+  _globals['_MATRIX']._serialized_start=525
+  _globals['_MATRIX']._serialized_end=575
+  _globals['_TRAINRESPONSE']._serialized_start=578
+  _globals['_TRAINRESPONSE']._serialized_end=715
+  _globals['_TRAINRESPONSE_METRICSENTRY']._serialized_start=669
+  _globals['_TRAINRESPONSE_METRICSENTRY']._serialized_end=715
+  _globals['_PREDICTREQUEST']._serialized_start=717
+  _globals['_PREDICTREQUEST']._serialized_end=781
+  _globals['_PREDICTRESPONSE']._serialized_start=783
+  _globals['_PREDICTRESPONSE']._serialized_end=821
+  _globals['_MODELID']._serialized_start=823
+  _globals['_MODELID']._serialized_end=850
+  _globals['_RETRAINREQUEST']._serialized_start=852
   _globals['_RETRAINREQUEST']._serialized_end=927
   _globals['_RETRAINRESPONSE']._serialized_start=929
   _globals['_RETRAINRESPONSE']._serialized_end=1052
-  _globals['_RETRAINRESPONSE_METRICSENTRY']._serialized_start=657
-  _globals['_RETRAINRESPONSE_METRICSENTRY']._serialized_end=703
+  _globals['_RETRAINRESPONSE_METRICSENTRY']._serialized_start=669
+  _globals['_RETRAINRESPONSE_METRICSENTRY']._serialized_end=715
   _globals['_METRICSRESPONSE']._serialized_start=1054
   _globals['_METRICSRESPONSE']._serialized_end=1177
-  _globals['_METRICSRESPONSE_METRICSENTRY']._serialized_start=657
-  _globals['_METRICSRESPONSE_METRICSENTRY']._serialized_end=703
+  _globals['_METRICSRESPONSE_METRICSENTRY']._serialized_start=669
+  _globals['_METRICSRESPONSE_METRICSENTRY']._serialized_end=715
   _globals['_MODELRESPONSE']._serialized_start=1180
-  _globals['_MODELRESPONSE']._serialized_end=1452
-  _globals['_MODELRESPONSE_PARAMSENTRY']._serialized_start=484
-  _globals['_MODELRESPONSE_PARAMSENTRY']._serialized_end=529
-  _globals['_MODELRESPONSE_METRICSENTRY']._serialized_start=657
-  _globals['_MODELRESPONSE_METRICSENTRY']._serialized_end=703
-  _globals['_LISTMODELSRESPONSE']._serialized_start=1454
-  _globals['_LISTMODELSRESPONSE']._serialized_end=1516
-  _globals['_DELETERESPONSE']._serialized_start=1518
-  _globals['_DELETERESPONSE']._serialized_end=1551
-  _globals['_MLSERVICE']._serialized_start=1554
-  _globals['_MLSERVICE']._serialized_end=2150
+  _globals['_MODELRESPONSE']._serialized_end=1468
+  _globals['_MODELRESPONSE_PARAMSENTRY']._serialized_start=478
+  _globals['_MODELRESPONSE_PARAMSENTRY']._serialized_end=523
+  _globals['_MODELRESPONSE_METRICSENTRY']._serialized_start=669
+  _globals['_MODELRESPONSE_METRICSENTRY']._serialized_end=715
+  _globals['_LISTMODELSRESPONSE']._serialized_start=1470
+  _globals['_LISTMODELSRESPONSE']._serialized_end=1532
+  _globals['_DELETERESPONSE']._serialized_start=1534
+  _globals['_DELETERESPONSE']._serialized_end=1567
+  _globals['_JOBID']._serialized_start=1569
+  _globals['_JOBID']._serialized_end=1592
+  _globals['_JOBRESPONSE']._serialized_start=1594
+  _globals['_JOBRESPONSE']._serialized_end=1623
+  _globals['_JOBSTATUSRESPONSE']._serialized_start=1626
+  _globals['_JOBSTATUSRESPONSE']._serialized_end=1818
+  _globals['_JOBSTATUSRESPONSE_METRICSENTRY']._serialized_start=669
+  _globals['_JOBSTATUSRESPONSE_METRICSENTRY']._serialized_end=715
+  _globals['_MLSERVICE']._serialized_start=1821
+  _globals['_MLSERVICE']._serialized_end=2548
 # @@protoc_insertion_point(module_scope)
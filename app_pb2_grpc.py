@@ -80,6 +80,16 @@ class MLServiceStub(object):
                 request_serializer=app__pb2.ModelId.SerializeToString,
                 response_deserializer=app__pb2.MetricsResponse.FromString,
                 _registered_method=True)
+        self.SubmitTrainJob = channel.unary_unary(
+                '/mlservice.MLService/SubmitTrainJob',
+                request_serializer=app__pb2.TrainRequest.SerializeToString,
+                response_deserializer=app__pb2.JobResponse.FromString,
+                _registered_method=True)
+        self.GetJobStatus = channel.unary_unary(
+                '/mlservice.MLService/GetJobStatus',
+                request_serializer=app__pb2.JobId.SerializeToString,
+                response_deserializer=app__pb2.JobStatusResponse.FromString,
+                _registered_method=True)
 
 
 class MLServiceServicer(object):
@@ -140,6 +150,18 @@ class MLServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SubmitTrainJob(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetJobStatus(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_MLServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -188,6 +210,16 @@ def add_MLServiceServicer_to_server(servicer, server):
                     request_deserializer=app__pb2.ModelId.FromString,
                     response_serializer=app__pb2.MetricsResponse.SerializeToString,
             ),
+            'SubmitTrainJob': grpc.unary_unary_rpc_method_handler(
+                    servicer.SubmitTrainJob,
+                    request_deserializer=app__pb2.TrainRequest.FromString,
+                    response_serializer=app__pb2.JobResponse.SerializeToString,
+            ),
+            'GetJobStatus': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetJobStatus,
+                    request_deserializer=app__pb2.JobId.FromString,
+                    response_serializer=app__pb2.JobStatusResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'mlservice.MLService', rpc_method_handlers)
@@ -442,3 +474,57 @@ class MLService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def SubmitTrainJob(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/mlservice.MLService/SubmitTrainJob',
+            app__pb2.TrainRequest.SerializeToString,
+            app__pb2.JobResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetJobStatus(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/mlservice.MLService/GetJobStatus',
+            app__pb2.JobId.SerializeToString,
+            app__pb2.JobStatusResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -3,10 +3,13 @@ import requests
 import json
 import pandas as pd
 import os
+import time
 
 # Конфигурация
 BASE_URL = os.getenv("API_URL", "http://localhost:5000")
 # BASE_URL = "http://localhost:5000"
+# Сколько секунд ждать завершения задачи обучения
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", "300"))
 
 st.set_page_config(page_title="ML Models Dashboard", layout="wide")
 st.title("ML models management dashboard")
@@ -83,11 +86,25 @@ elif page == "Train model":
                                    headers={"Content-Type": "application/json"},
                                    data=json.dumps(data))
             
-            if response.status_code == 201:
-                result = response.json()
-                st.success("Model trained successfully! Let`s goo")
-                st.write(f"**Model ID**: {result['model_id']}")
-                st.write(f"**Metrics**: {result['metrics']}")
+            if response.status_code == 202:
+                job_id = response.json()['job_id']
+                # Обучение идет в фоне, опрашиваем статус задачи
+                with st.spinner(f"Training in progress (job {job_id})..."):
+                    deadline = time.monotonic() + JOB_TIMEOUT
+                    while True:
+                        job = requests.get(f"{BASE_URL}/jobs/{job_id}").json()
+                        if job['status'] in ("SUCCESS", "FAILURE") or time.monotonic() > deadline:
+                            break
+                        time.sleep(1)
+                if job['status'] == "SUCCESS":
+                    result = job['result']
+                    st.success("Model trained successfully! Let`s goo")
+                    st.write(f"**Model ID**: {result['model_id']}")
+                    st.write(f"**Metrics**: {result['metrics']}")
+                elif job['status'] == "FAILURE":
+                    st.error(f"Training failed: {job.get('error')}")
+                else:
+                    st.warning(f"Job {job_id} is still {job['status']} after {JOB_TIMEOUT}s. Check that Redis and the Celery worker are running")
             else:
                 st.error(f"Training failed: {response.text}")
         except Exception as e:
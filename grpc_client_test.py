@@ -1,7 +1,31 @@
+import time
 import grpc
+import numpy as np
 import app_pb2
 import app_pb2_grpc
 
+def to_matrix(X):
+    # Упаковываем признаки в float32 байты построчно
+    X_arr = np.asarray(X, dtype='<f4')
+    return app_pb2.Matrix(data=X_arr.tobytes(), rows=X_arr.shape[0], cols=X_arr.shape[1])
+
+def to_labels(y):
+    # Метки передаются как int32 байты
+    return np.asarray(y, dtype='<i4').tobytes()
+
+def wait_for_ready(stub, model_id, timeout=300):
+    # Артефакт модели загружается в MLflow в фоне - до статуса ready предсказания могут отвечать UNAVAILABLE
+    deadline = time.monotonic() + timeout
+    while True:
+        status = stub.GetModel(app_pb2.ModelId(model_id=model_id)).status
+        if status == "ready":
+            return
+        if status == "failed":
+            raise RuntimeError(f"Model {model_id} upload to MLflow failed")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Model {model_id} is still {status} after {timeout}s")
+        time.sleep(1)
+
 def test_grpc():
     # Подключаемся к серверу
     channel = grpc.insecure_channel('localhost:50051')
@@ -23,18 +47,11 @@ def test_grpc():
         
         # 3. Тест TrainModel
         print("\n3. Testing TrainModel...")
-        # Создаем FeatureArray для 2D данных
-        feature_arrays = []
-        for features in [[1.0, 2.0], [2.0, 1.0], [3.0, 4.0], [4.0, 3.0]]:
-            feature_array = app_pb2.FeatureArray()
-            feature_array.features.extend(features)
-            feature_arrays.append(feature_array)
-        
         train_response = stub.TrainModel(app_pb2.TrainRequest(
             model_type="logistic_regression",
             params={"max_iter": "100", "C": "1.0"},
-            X=feature_arrays,
-            y=[0, 1, 0, 1]
+            X=to_matrix([[1.0, 2.0], [2.0, 1.0], [3.0, 4.0], [4.0, 3.0]]),
+            y=to_labels([0, 1, 0, 1])
         ))
         model_id = train_response.model_id
         print(f"Success! Model trained: {model_id}")
@@ -53,18 +70,14 @@ def test_grpc():
         
         # 6. Тест Predict
         print("\n6. Testing Predict...")
-        # Создаем тестовые данные для предсказания
-        predict_features = []
-        for features in [[1.5, 2.5], [3.5, 4.5]]:
-            feature_array = app_pb2.FeatureArray()
-            feature_array.features.extend(features)
-            predict_features.append(feature_array)
-            
+        print(f"Waiting for model upload (status: {model_info.status})...")
+        wait_for_ready(stub, model_id)
         predict_response = stub.Predict(app_pb2.PredictRequest(
             model_id=model_id,
-            X=predict_features
+            X=to_matrix([[1.5, 2.5], [3.5, 4.5]])
         ))
-        print(f"Success! Predictions: {predict_response.predictions}")
+        predictions = np.frombuffer(predict_response.predictions, dtype='<f4')
+        print(f"Success! Predictions: {predictions.tolist()}")
         
         # 7. Тест GetMetrics
         print("\n7. Testing GetMetrics...")
@@ -74,16 +87,10 @@ def test_grpc():
         # 8. Тест RetrainModel
         print("\n8. Testing RetrainModel...")
         # Новые данные для переобучения
-        new_feature_arrays = []
-        for features in [[1.0, 1.0], [2.0, 2.0], [3.0, 3.0], [4.0, 4.0]]:
-            feature_array = app_pb2.FeatureArray()
-            feature_array.features.extend(features)
-            new_feature_arrays.append(feature_array)
-            
         retrain_response = stub.RetrainModel(app_pb2.RetrainRequest(
             model_id=model_id,
-            X=new_feature_arrays,
-            y=[1, 0, 1, 0]
+            X=to_matrix([[1.0, 1.0], [2.0, 2.0], [3.0, 3.0], [4.0, 4.0]]),
+            y=to_labels([1, 0, 1, 0])
         ))
         print(f"Success! Retrained metrics: {dict(retrain_response.metrics)}")
         
@@ -2,193 +2,356 @@ import grpc
 from concurrent import futures
 import app_pb2
 import app_pb2_grpc
+import asyncio
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import time
+import numpy as np
+from logging.handlers import QueueHandler, QueueListener
 from flask import Flask
-from typing import Any, Dict, List, Optional
-from models import db, MLModel, AVAILABLE_MODELS, create_model_record, train_and_log_model, load_model_from_mlflow, convert_params
+from log_handlers import SizeRotatingFileHandler
+from prometheus_client import Counter, Histogram, start_http_server
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+from celery.result import AsyncResult
+from models import db, init_db, MLModel, ENGINE_OPTIONS, AVAILABLE_MODELS, create_model_record, replace_model_record, train_and_log_model, get_cached_model, load_model_from_mlflow, convert_params, lookup_model, evict_model, track_upload_status
+from tasks import celery_app, train_task
 
 # Настройка логгера для gRPC сервера
 logger = logging.getLogger('grpc_server')
-logger.setLevel(logging.INFO)
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
 
 os.makedirs("logs", exist_ok=True)
-file_handler = RotatingFileHandler(
+file_handler = SizeRotatingFileHandler(
     'logs/grpc_server.log', 
-    maxBytes=1024 * 1024,
+    maxBytes=50 * 1024 * 1024,
     backupCount=10
 )
 formatter = logging.Formatter(
     '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
+
+# Запись в файл идет в фоновом потоке, обработчик запроса только кладет запись в очередь
+log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+logger.addHandler(QueueHandler(log_queue))
+log_listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
-db.init_app(app)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = ENGINE_OPTIONS
+init_db(app)
+
+# Размер пула потоков для блокирующих операций (БД, MLflow, sklearn)
+GRPC_MAX_WORKERS = int(os.getenv("GRPC_MAX_WORKERS", "32"))
+
+# Порт HTTP эндпоинта /metrics для Prometheus. Процессы gRPC сервера делят порт 50051 (SO_REUSEPORT),
+# а метрики у каждого свои: процесс берет первый свободный порт из METRICS_PORT .. METRICS_PORT + METRICS_PORT_RANGE - 1
+METRICS_PORT = int(os.getenv("METRICS_PORT", "8001"))
+METRICS_PORT_RANGE = int(os.getenv("METRICS_PORT_RANGE", "16"))
+
+# Метрики Prometheus для пути предсказания (дешевле, чем лог на каждый запрос)
+PREDICTION_REQUESTS = Counter('prediction_requests_total', 'Number of prediction requests')
+PREDICTION_DURATION = Histogram('prediction_duration_seconds', 'Prediction request duration in seconds')
+
+T = TypeVar('T')
+
+# Список доступных моделей статичен - ответ собираем один раз при импорте
+MODEL_CLASSES_RESPONSE = app_pb2.ModelClassesResponse(model_classes={
+    key: app_pb2.ModelClassInfo(
+        class_name=val["class"].__name__,
+        hyperparameters=val["hyperparameters"],
+        description=val["description"]
+    )
+    for key, val in AVAILABLE_MODELS.items()
+})
+
+def matrix_to_array(matrix: Any) -> np.ndarray:
+    """
+    Отображает упакованную float32 матрицу из запроса в ndarray без копирования.
+    Если размер данных не совпадает с rows x cols - бросает ValueError
+    """
+    if matrix.rows <= 0 or matrix.cols <= 0:
+        raise ValueError(f"Matrix must be non-empty, got {matrix.rows}x{matrix.cols}")
+    expected = matrix.rows * matrix.cols * 4
+    if len(matrix.data) != expected:
+        raise ValueError(
+            f"Matrix {matrix.rows}x{matrix.cols} needs {expected} bytes of float32 data, got {len(matrix.data)}"
+        )
+    return np.frombuffer(matrix.data, dtype='<f4').reshape(matrix.rows, matrix.cols)
+
+def labels_to_array(data: bytes, rows: int) -> np.ndarray:
+    """
+    Отображает упакованные int32 метки из запроса в ndarray без копирования.
+    Если меток не столько же, сколько строк матрицы - бросает ValueError
+    """
+    if len(data) != rows * 4:
+        raise ValueError(f"Expected {rows} int32 labels ({rows * 4} bytes), got {len(data)} bytes")
+    return np.frombuffer(data, dtype='<i4')
+
+def training_arrays(request: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """Разбирает X и y запроса на обучение, проверяя их размеры"""
+    X = matrix_to_array(request.X)
+    return X, labels_to_array(request.y, len(X))
 
 class MLService(app_pb2_grpc.MLServiceServicer):
+
+    def __init__(self, executor: futures.ThreadPoolExecutor) -> None:
+        self.executor = executor
+
+    async def run_blocking(self, func: Callable[..., T], *args: Any) -> T:
+        """Выполняет блокирующий код (БД, MLflow, sklearn) в пуле потоков внутри app_context"""
+        def call() -> T:
+            with app.app_context():
+                return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
     
-    def HealthCheck(self, request: Any, context: Any) -> app_pb2.HealthResponse:
-        logger.info("Health check requested via gRPC")
+    async def HealthCheck(self, request: Any, context: Any) -> app_pb2.HealthResponse:
+        logger.debug("Health check requested via gRPC")
         return app_pb2.HealthResponse(status="ok")
     
-    def GetModelClasses(self, request: Any, context: Any) -> app_pb2.ModelClassesResponse:
-        logger.info("Request for available model classes via gRPC")
-        model_classes = {}
-        for key, val in AVAILABLE_MODELS.items():
-            model_classes[key] = app_pb2.ModelClassInfo(
-                class_name=val["class"].__name__,
-                hyperparameters=val["hyperparameters"],
-                description=val["description"]
-            )
-        logger.info(f"Returning {len(model_classes)} model classes via gRPC")
-        return app_pb2.ModelClassesResponse(model_classes=model_classes)
+    async def GetModelClasses(self, request: Any, context: Any) -> app_pb2.ModelClassesResponse:
+        logger.debug("Request for available model classes via gRPC")
+        return MODEL_CLASSES_RESPONSE
     
-    def ListModels(self, request: Any, context: Any) -> app_pb2.ListModelsResponse:
-        logger.info("Request for list of all models via gRPC")
-        with app.app_context():
-            models = MLModel.query.all()
-            model_list = []
-            for m in models:
-                model_response = app_pb2.ModelResponse(
-                    id=str(m.id),
-                    model_type=str(m.model_type),
-                    params={str(k): str(v) for k, v in m.params.items()} if m.params else {},
-                    created_at=m.created_at.isoformat() if m.created_at else "",
-                    metrics={str(k): float(v) for k, v in m.metrics.items()} if m.metrics else {}
-                )
-                model_list.append(model_response)
-            logger.info(f"Returning {len(model_list)} models via gRPC")
-            return app_pb2.ListModelsResponse(models=model_list)
+    async def ListModels(self, request: Any, context: Any) -> app_pb2.ListModelsResponse:
+        logger.debug("Request for list of all models via gRPC")
+        rows = await self.run_blocking(lambda: db.session.execute(
+            db.select(MLModel.id, MLModel.model_type, MLModel.created_at, MLModel.metrics, MLModel.status)
+            .order_by(MLModel.created_at)
+        ).all())
+        model_list = []
+        for r in rows:
+            model_response = app_pb2.ModelResponse(
+                id=str(r.id),
+                model_type=str(r.model_type),
+                created_at=r.created_at.isoformat() if r.created_at else "",
+                metrics={str(k): float(v) for k, v in r.metrics.items()} if r.metrics else {},
+                status=r.status or ""
+            )
+            model_list.append(model_response)
+        logger.debug("Returning %d models via gRPC", len(model_list))
+        return app_pb2.ListModelsResponse(models=model_list)
     
-    def TrainModel(self, request: Any, context: Any) -> app_pb2.TrainResponse:
+    async def TrainModel(self, request: Any, context: Any) -> app_pb2.TrainResponse:
         logger.info("Starting model training request via gRPC")
-        with app.app_context():
-            model_type = request.model_type
-            params = dict(request.params)
-            X = [list(row.features) for row in request.X]
-            y = list(request.y)
-            logger.info(f"Training model type: {model_type} with {len(X)} samples via gRPC")
-            if model_type not in AVAILABLE_MODELS:
-                logger.error(f"Unsupported model type via gRPC: {model_type}")
-                context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Unsupported model type")
-            try:
-                run_id, metrics, model_uri = train_and_log_model(model_type, params, X, y)
-                record = create_model_record(run_id, model_type, params, model_uri, metrics)
-                db.session.add(record)
-                db.session.commit()
-                logger.info(f"Model trained successfully via gRPC. ID: {run_id}, Metrics: {metrics}")
-                return app_pb2.TrainResponse(
-                    model_id=run_id, 
-                    metrics={k: float(v) for k, v in metrics.items()}
-                )
-            except Exception as e:
-                logger.error(f"Training failed via gRPC: {e}")
-                context.abort(grpc.StatusCode.INTERNAL, f"Training failed: {str(e)}")
-
-    def GetModel(self, request: Any, context: Any) -> app_pb2.ModelResponse:
-        logger.info(f"Request for model info via gRPC: {request.model_id}")
-        with app.app_context():
-            record = MLModel.query.filter_by(id=request.model_id).first()
+        model_type = request.model_type
+        if model_type not in AVAILABLE_MODELS:
+            logger.error("Unsupported model type via gRPC: %s", model_type)
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Unsupported model type")
+        params = dict(request.params)
+        try:
+            X, y = training_arrays(request)
+        except ValueError as e:
+            logger.warning("Invalid training data via gRPC: %s", e)
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+
+        def train() -> Tuple[str, Dict[str, float]]:
+            logger.info("Training model type: %s with %d samples via gRPC", model_type, len(X))
+            run_id, metrics, model_uri = train_and_log_model(model_type, params, X, y)
+            record = create_model_record(run_id, model_type, params, model_uri, metrics)
+            db.session.add(record)
+            db.session.commit()
+            track_upload_status(app, model_uri)
+            return run_id, metrics
+
+        try:
+            run_id, metrics = await self.run_blocking(train)
+        except Exception as e:
+            logger.error("Training failed via gRPC: %s", e)
+            await context.abort(grpc.StatusCode.INTERNAL, f"Training failed: {str(e)}")
+        logger.info("Model trained successfully via gRPC. ID: %s, Metrics: %s", run_id, metrics)
+        return app_pb2.TrainResponse(
+            model_id=run_id, 
+            metrics={k: float(v) for k, v in metrics.items()}
+        )
+
+    async def SubmitTrainJob(self, request: Any, context: Any) -> app_pb2.JobResponse:
+        logger.info("Submitting model training job via gRPC")
+        model_type = request.model_type
+        if model_type not in AVAILABLE_MODELS:
+            logger.error("Unsupported model type via gRPC: %s", model_type)
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Unsupported model type")
+        params = dict(request.params)
+        try:
+            X, y = training_arrays(request)
+        except ValueError as e:
+            logger.warning("Invalid training data via gRPC: %s", e)
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        # Аргументы Celery сериализуются в JSON, поэтому передаем списки
+        job = await self.run_blocking(train_task.delay, model_type, params, X.tolist(), y.tolist())
+        logger.info("Training job submitted via gRPC. Job ID: %s", job.id)
+        return app_pb2.JobResponse(job_id=job.id)
+
+    async def GetJobStatus(self, request: Any, context: Any) -> app_pb2.JobStatusResponse:
+        logger.debug("Status request for job via gRPC: %s", request.job_id)
+
+        def job_status() -> app_pb2.JobStatusResponse:
+            job = AsyncResult(request.job_id, app=celery_app)
+            response = app_pb2.JobStatusResponse(job_id=request.job_id, status=job.state)
+            if job.successful():
+                result = job.result
+                response.model_id = result.get('model_id') or result.get('new_model_id', "")
+                response.metrics.update({k: float(v) for k, v in result['metrics'].items()})
+            elif job.failed():
+                response.error = str(job.result)
+            return response
+
+        return await self.run_blocking(job_status)
+
+    async def GetModel(self, request: Any, context: Any) -> app_pb2.ModelResponse:
+        logger.debug("Request for model info via gRPC: %s", request.model_id)
+
+        def get_model() -> Optional[app_pb2.ModelResponse]:
+            record = db.session.get(MLModel, request.model_id)
             if not record:
-                logger.warning(f"Model not found via gRPC: {request.model_id}")
-                context.abort(grpc.StatusCode.NOT_FOUND, "Model not found")
-            logger.info(f"Returning model info via gRPC: {request.model_id}")
+                return None
             return app_pb2.ModelResponse(
                 id=str(record.id),
                 model_type=str(record.model_type),
                 params={str(k): str(v) for k, v in record.params.items()} if record.params else {},
                 created_at=record.created_at.isoformat() if record.created_at else "",
-                metrics={str(k): float(v) for k, v in record.metrics.items()} if record.metrics else {}
+                metrics={str(k): float(v) for k, v in record.metrics.items()} if record.metrics else {},
+                status=record.status or ""
             )
+
+        response = await self.run_blocking(get_model)
+        if response is None:
+            logger.warning("Model not found via gRPC: %s", request.model_id)
+            await context.abort(grpc.StatusCode.NOT_FOUND, "Model not found")
+        logger.debug("Returning model info via gRPC: %s", request.model_id)
+        return response
     
-    def DeleteModel(self, request: Any, context: Any) -> app_pb2.DeleteResponse:
-        logger.info(f"Request to delete model via gRPC: {request.model_id}")
-        with app.app_context():
-            record = MLModel.query.filter_by(id=request.model_id).first()
+    async def DeleteModel(self, request: Any, context: Any) -> app_pb2.DeleteResponse:
+        logger.info("Request to delete model via gRPC: %s", request.model_id)
+
+        def delete_model() -> bool:
+            record = db.session.get(MLModel, request.model_id)
             if not record:
-                logger.warning(f"Model not found for deletion via gRPC: {request.model_id}")
-                context.abort(grpc.StatusCode.NOT_FOUND, "Model not found")
-            
+                return False
             # Мы НЕ удаляем артефакты из S3/MLflow, только запись из локальной БД
+            file_path = record.file_path
             db.session.delete(record)
             db.session.commit()
-            
-            logger.info(f"Model deleted successfully via gRPC: {request.model_id}")
-            return app_pb2.DeleteResponse(success=True)
-
-    def Predict(self, request: Any, context: Any) -> app_pb2.PredictResponse:
-        logger.info(f"Prediction request for model via gRPC: {request.model_id}")
-        with app.app_context():
-            record = MLModel.query.filter_by(id=request.model_id).first()
-            if not record:
-                logger.warning(f"Model not found for prediction via gRPC: {request.model_id}")
-                context.abort(grpc.StatusCode.NOT_FOUND, "Model not found")
-            try:
-                model = load_model_from_mlflow(record.file_path)
-                X = [list(row.features) for row in request.X]
-                logger.info(f"Making prediction via gRPC with {len(X)} samples")
-                preds = model.predict(X).tolist()
-                logger.info(f"Prediction completed via gRPC. Returning {len(preds)} predictions")
-                return app_pb2.PredictResponse(predictions=[float(p) for p in preds])
-            except Exception as e:
-                logger.error(f"Prediction failed via gRPC: {e}")
-                context.abort(grpc.StatusCode.INTERNAL, "Failed to load model or make prediction")
+            evict_model(file_path)
+            return True
+
+        if not await self.run_blocking(delete_model):
+            logger.warning("Model not found for deletion via gRPC: %s", request.model_id)
+            await context.abort(grpc.StatusCode.NOT_FOUND, "Model not found")
+        logger.info("Model deleted successfully via gRPC: %s", request.model_id)
+        return app_pb2.DeleteResponse(success=True)
+
+    async def Predict(self, request: Any, context: Any) -> app_pb2.PredictResponse:
+        PREDICTION_REQUESTS.inc()
+        start = time.perf_counter()
+        try:
+            file_path, _, _, status = await self.run_blocking(lookup_model, request.model_id)
+        except KeyError:
+            logger.warning("Model not found for prediction via gRPC: %s", request.model_id)
+            await context.abort(grpc.StatusCode.NOT_FOUND, "Model not found")
+        # Модель, обученная в этом процессе, уже в памяти. Иначе ее можно загрузить только из MLflow,
+        # а пока артефакт не загружен - отвечаем сразу, не занимая поток
+        cached = get_cached_model(file_path)
+        if cached is None and status == 'uploading':
+            await context.abort(grpc.StatusCode.UNAVAILABLE, "Model is still being uploaded to MLflow, try again later")
+        if cached is None and status == 'failed':
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, "Model upload to MLflow failed, retrain the model")
+        try:
+            X_arr = matrix_to_array(request.X)
+        except ValueError as e:
+            logger.warning("Invalid prediction data via gRPC: %s", e)
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+
+        def predict() -> np.ndarray:
+            model = cached if cached is not None else load_model_from_mlflow(file_path)
+            return model.predict(X_arr)
+
+        try:
+            preds = await self.run_blocking(predict)
+        except Exception as e:
+            logger.error("Prediction failed via gRPC: %s", e)
+            await context.abort(grpc.StatusCode.INTERNAL, "Failed to load model or make prediction")
+        PREDICTION_DURATION.observe(time.perf_counter() - start)
+        logger.debug("Predicted n=%d for model %s via gRPC", len(preds), request.model_id)
+        return app_pb2.PredictResponse(predictions=preds.astype('<f4').tobytes())
     
-    def RetrainModel(self, request: Any, context: Any) -> app_pb2.RetrainResponse:
-        logger.info(f"Retrain request for model via gRPC: {request.model_id}")
-        with app.app_context():
-            record = MLModel.query.filter_by(id=request.model_id).first()
-            if not record:
-                logger.warning(f"Model not found for retraining via gRPC: {request.model_id}")
-                context.abort(grpc.StatusCode.NOT_FOUND, "Model not found")
-            X = [list(row.features) for row in request.X]
-            y = list(request.y)
-            params = record.params
-            model_type = record.model_type
-            try:
-                new_run_id, metrics, new_model_uri = train_and_log_model(model_type, params, X, y)
-                db.session.delete(record)
-                new_record = create_model_record(new_run_id, model_type, params, new_model_uri, metrics)
-                db.session.add(new_record)
-                db.session.commit()
-                logger.info(f"Model retrained successfully via gRPC. Old ID: {request.model_id}, New ID: {new_run_id}")
-                return app_pb2.RetrainResponse(
-                    metrics={k: float(v) for k, v in metrics.items()}
-                )
-            except Exception as e:
-                logger.error(f"Retraining failed via gRPC: {e}")
-                context.abort(grpc.StatusCode.INTERNAL, f"Retraining failed: {str(e)}")
-
-    def GetMetrics(self, request: Any, context: Any) -> app_pb2.MetricsResponse:
-        logger.info(f"Metrics request for model via gRPC: {request.model_id}")
-        with app.app_context():
-            record = MLModel.query.filter_by(id=request.model_id).first()
-            if not record:
-                logger.warning(f"Model not found for metrics via gRPC: {request.model_id}")
-                context.abort(grpc.StatusCode.NOT_FOUND, "Model not found")
-            
-            logger.info(f"Returning metrics via gRPC for model: {request.model_id}")
-            return app_pb2.MetricsResponse(
-                metrics={str(k): float(v) for k, v in record.metrics.items()} if record.metrics else {}
-            )
+    async def RetrainModel(self, request: Any, context: Any) -> app_pb2.RetrainResponse:
+        logger.info("Retrain request for model via gRPC: %s", request.model_id)
+        record = await self.run_blocking(db.session.get, MLModel, request.model_id)
+        if not record:
+            logger.warning("Model not found for retraining via gRPC: %s", request.model_id)
+            await context.abort(grpc.StatusCode.NOT_FOUND, "Model not found")
+        params = record.params
+        model_type = record.model_type
+        old_model_uri = record.file_path
+        try:
+            X, y = training_arrays(request)
+        except ValueError as e:
+            logger.warning("Invalid training data via gRPC: %s", e)
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+
+        def retrain() -> Tuple[str, Dict[str, float]]:
+            new_run_id, metrics, new_model_uri = train_and_log_model(model_type, params, X, y)
+            replace_model_record(request.model_id, new_run_id, new_model_uri, metrics)
+            db.session.commit()
+            track_upload_status(app, new_model_uri)
+            evict_model(old_model_uri)
+            return new_run_id, metrics
+
+        try:
+            new_run_id, metrics = await self.run_blocking(retrain)
+        except Exception as e:
+            logger.error("Retraining failed via gRPC: %s", e)
+            await context.abort(grpc.StatusCode.INTERNAL, f"Retraining failed: {str(e)}")
+        logger.info("Model retrained successfully via gRPC. Old ID: %s, New ID: %s", request.model_id, new_run_id)
+        return app_pb2.RetrainResponse(
+            metrics={k: float(v) for k, v in metrics.items()}
+        )
+
+    async def GetMetrics(self, request: Any, context: Any) -> app_pb2.MetricsResponse:
+        logger.debug("Metrics request for model via gRPC: %s", request.model_id)
+        record = await self.run_blocking(db.session.get, MLModel, request.model_id)
+        if not record:
+            logger.warning("Model not found for metrics via gRPC: %s", request.model_id)
+            await context.abort(grpc.StatusCode.NOT_FOUND, "Model not found")
+        
+        logger.debug("Returning metrics via gRPC for model: %s", request.model_id)
+        return app_pb2.MetricsResponse(
+            metrics={str(k): float(v) for k, v in record.metrics.items()} if record.metrics else {}
+        )
+
+def start_metrics_server() -> int:
+    """Запускает HTTP эндпоинт /metrics на первом свободном порту и возвращает этот порт"""
+    for port in range(METRICS_PORT, METRICS_PORT + METRICS_PORT_RANGE):
+        try:
+            start_http_server(port)
+            return port
+        except OSError:
+            logger.debug("Metrics port %d is busy", port)
+    raise OSError(f"No free metrics port in {METRICS_PORT}..{METRICS_PORT + METRICS_PORT_RANGE - 1}")
 
-def serve() -> None:
+async def serve() -> None:
     logger.info("Starting gRPC server")
     with app.app_context():
         db.create_all()
         logger.info("Database tables created for gRPC server")
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=5))
-    app_pb2_grpc.add_MLServiceServicer_to_server(MLService(), server)
+    # Event loop принимает запросы, блокирующая работа уходит в пул потоков
+    executor = futures.ThreadPoolExecutor(max_workers=GRPC_MAX_WORKERS)
+    # SO_REUSEPORT: несколько процессов gRPC сервера могут слушать один порт
+    server = grpc.aio.server(options=[('grpc.so_reuseport', 1)])
+    app_pb2_grpc.add_MLServiceServicer_to_server(MLService(executor), server)
     server.add_insecure_port('[::]:50051')
+    metrics_port = start_metrics_server()
+    logger.info("Prometheus metrics served on port %d", metrics_port)
     logger.info("gRPC server started on port 50051")
     print("gRPC server started on port 50051")
-    server.start()
+    await server.start()
     logger.info("gRPC server waiting for termination")
-    server.wait_for_termination()
+    await server.wait_for_termination()
 
 if __name__ == "__main__":
-    serve()
\ No newline at end of file
+    asyncio.run(serve())
@@ -0,0 +1,37 @@
+import multiprocessing
+import os
+import shutil
+
+# Запуск: gunicorn app:app (конфиг подхватывается из текущего каталога)
+bind = "0.0.0.0:5000"
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+# Heartbeat файлы воркеров держим в памяти, а не на диске
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+# Приложение (sklearn, mlflow, AVAILABLE_MODELS) импортируется один раз и делится между воркерами через fork
+preload_app = True
+
+# Воркеры пишут логи в stdout, а не в общий файл с ротацией (app.py читает это при импорте)
+os.environ.setdefault("LOG_TO_STDOUT", "1")
+
+# Каталог для метрик Prometheus из нескольких процессов: должен существовать и быть пустым
+# до импорта приложения, поэтому готовим его при чтении конфига
+_multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if _multiproc_dir:
+    shutil.rmtree(_multiproc_dir, ignore_errors=True)
+    os.makedirs(_multiproc_dir, exist_ok=True)
+
+
+def post_fork(server, worker):
+    # Потоки и соединения с БД из master процесса в воркере непригодны - пересоздаем
+    import app as flask_app
+    flask_app.start_log_listener()
+    with flask_app.app.app_context():
+        flask_app.db.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
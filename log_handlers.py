@@ -0,0 +1,17 @@
+import logging
+from logging.handlers import RotatingFileHandler
+
+
+class SizeRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler, который решает о ротации по позиции открытого потока.
+    Стандартный обработчик на каждую запись форматирует сообщение повторно
+    и проверяет файл через os.stat; здесь достаточно stream.tell().
+    """
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.maxBytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        return self.stream.tell() >= self.maxBytes
@@ -1,11 +1,19 @@
 import os
+import re
 import logging
-from datetime import datetime
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
 from typing import Dict, Any, List, Union, Optional, Tuple
+import numpy as np
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, precision_score, recall_score
+from sklearn.metrics import confusion_matrix
 import mlflow
 import mlflow.sklearn
 # from dotenv import load_dotenv
@@ -22,27 +30,58 @@ try:
     mlflow.set_tracking_uri(tracking_uri)
     mlflow.set_experiment("final_check_experiment")
 except Exception as e:
-    logger.warning(f"Could not set MLflow experiment (likely due to missing server connection): {e}")
+    logger.warning("Could not set MLflow experiment (likely due to missing server connection): %s", e)
 
 db = SQLAlchemy()
 
+# Настройки движка БД для всех приложений (Flask API, gRPC, Celery)
+ENGINE_OPTIONS = {'pool_size': 20, 'pool_pre_ping': True}
+
+def set_sqlite_pragma(dbapi_connection: Any, connection_record: Any) -> None:
+    """Включает WAL для SQLite: чтения не блокируются параллельной записью"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
+
+def init_db(app: Flask) -> None:
+    """
+    Подключает db к приложению и вешает set_sqlite_pragma только на движок этого приложения
+    (а не на все Engine процесса, например хранилище MLflow)
+    """
+    db.init_app(app)
+    with app.app_context():
+        event.listen(db.engine, "connect", set_sqlite_pragma)
+
 class MLModel(db.Model):
+    # Составной индекс покрывает и фильтр по model_type, и фильтр + сортировку по created_at
+    __table_args__ = (
+        db.Index('ix_ml_model_model_type_created_at', 'model_type', 'created_at'),
+    )
+
     id = db.Column(db.String, primary_key=True) 
     model_type = db.Column(db.String(120))
     params = db.Column(db.JSON)
-    file_path = db.Column(db.String(500)) 
-    created_at = db.Column(db.DateTime)
+    # По file_path обновляется статус после фоновой загрузки в MLflow
+    file_path = db.Column(db.String(500), index=True) 
+    created_at = db.Column(db.DateTime, index=True)
     metrics = db.Column(db.JSON)
+    # uploading - артефакт модели еще загружается в MLflow, ready - загружен, failed - ошибка
+    status = db.Column(db.String(20), default='ready')
 
     def to_dict(self) -> Dict[str, Any]:
         """Конвертирует модель в словарь для API ответов"""
-        logger.debug(f"Converting model {self.id} to dictionary")
+        logger.debug("Converting model %s to dictionary", self.id)
         return {
             'id': self.id,
             'model_type': self.model_type,
             'params': self.params,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'metrics': self.metrics
+            'metrics': self.metrics,
+            'status': self.status
         }
 
 # Доступные модели
@@ -59,36 +98,54 @@ AVAILABLE_MODELS = {
     }
 }
 
+# Те же записи чисел, что принимают int()/float(): знак, пробелы по краям, "_" между цифрами
+_DIGITS = r'\d+(?:_\d+)*'
+_INT_RE = re.compile(rf'[+-]?{_DIGITS}')
+_FLOAT_RE = re.compile(rf'[+-]?(?:{_DIGITS}\.?(?:{_DIGITS})?|\.{_DIGITS})(?:[eE][+-]?{_DIGITS})?')
+
 def convert_params(params: Dict[str, Any]) -> Dict[str, Union[int, float, str]]:
-    """Конвертирует строковые параметры в правильные типы"""
-    logger.debug(f"Converting parameters: {params}")
+    """
+    Конвертирует строковые параметры в правильные типы.
+    В отличие от float(), строки "nan", "inf" и "infinity" остаются строками
+    """
     converted_params = {}
     for key, value in params.items():
-        if isinstance(value, str):
-            if value.isdigit():
-                converted_params[key] = int(value)
-                logger.debug(f"Converted parameter {key} to int: {value}")
-            else:
-                try:
-                    converted_params[key] = float(value)
-                    logger.debug(f"Converted parameter {key} to float: {value}")
-                except ValueError:
-                    converted_params[key] = value
-                    logger.debug(f"Parameter {key} kept as string: {value}")
+        if not isinstance(value, str):
+            converted_params[key] = value
+            continue
+        number = value.strip()
+        if _INT_RE.fullmatch(number):
+            converted_params[key] = int(number)
+        elif _FLOAT_RE.fullmatch(number):
+            converted_params[key] = float(number)
         else:
             converted_params[key] = value
-            logger.debug(f"Parameter {key} kept as original type: {type(value)}")
     
-    logger.info(f"Parameters conversion completed. Converted {len(converted_params)} parameters")
+    logger.info("Parameters conversion completed. Converted %d parameters", len(converted_params))
     return converted_params
 
-def calculate_metrics(y_true: List[Union[int, float]], y_pred: List[Union[int, float]]) -> Dict[str, float]:
-    """Вычисляет метрики модели"""
-    logger.debug(f"Calculating metrics for {len(y_true)} samples")
+def calculate_metrics(
+    y_true: Union[List[Union[int, float]], np.ndarray], 
+    y_pred: Union[List[Union[int, float]], np.ndarray]
+) -> Dict[str, float]:
+    """
+    Вычисляет метрики модели (accuracy, weighted precision/recall).
+    Все метрики считаются по одной матрице ошибок
+    """
+    logger.debug("Calculating metrics for %d samples", len(y_true))
     try:
-        accuracy = float(accuracy_score(y_true, y_pred))
-        precision = float(precision_score(y_true, y_pred, average='weighted', zero_division=0))
-        recall = float(recall_score(y_true, y_pred, average='weighted', zero_division=0))
+        cm = confusion_matrix(np.asarray(y_true), np.asarray(y_pred))
+        tp = np.diag(cm)
+        support = cm.sum(axis=1)
+        pred_pos = cm.sum(axis=0)
+        # Как zero_division=0 в sklearn: класс без предсказаний/объектов дает 0
+        class_precision = np.divide(tp, pred_pos, out=np.zeros(len(tp)), where=pred_pos > 0)
+        class_recall = np.divide(tp, support, out=np.zeros(len(tp)), where=support > 0)
+        weights = support / support.sum()
+
+        accuracy = float(tp.sum() / cm.sum())
+        precision = float((class_precision * weights).sum())
+        recall = float((class_recall * weights).sum())
         
         metrics = {
             'accuracy': accuracy,
@@ -96,11 +153,11 @@ def calculate_metrics(y_true: List[Union[int, float]], y_pred: List[Union[int, f
             'recall': recall,
         }
         
-        logger.info(f"Metrics calculated - Accuracy: {accuracy:.4f}, Precision: {precision:.4f}, Recall: {recall:.4f}")
+        logger.info("Metrics calculated - Accuracy: %.4f, Precision: %.4f, Recall: %.4f", accuracy, precision, recall)
         return metrics
         
     except Exception as e:
-        logger.error(f"Error calculating metrics: {str(e)}")
+        logger.error("Error calculating metrics: %s", e)
         # Возвращаем метрики по умолчанию в случае ошибки
         return {
             'accuracy': 0.0,
@@ -111,36 +168,166 @@ def calculate_metrics(y_true: List[Union[int, float]], y_pred: List[Union[int, f
 def train_and_log_model(
     model_type: str, 
     params: Dict[str, Any], 
-    X: List[List[float]], 
-    y: List[Union[int, float]]
+    X: Union[List[List[float]], np.ndarray], 
+    y: Union[List[Union[int, float]], np.ndarray]
 ) -> Tuple[str, Dict[str, float], str]:
     """
     Обучает модель и логирует её в MLflow.
     Возвращает кортеж: (run_id, metrics, model_uri)
     """
-    logger.info(f"Starting training for {model_type}")
+    logger.info("Starting training for %s", model_type)
     converted_params = convert_params(params)
+    if model_type == 'random_forest' and converted_params.get('bootstrap', True):
+        # Out-of-bag оценка считается во время fit - не нужен второй проход predict по всем деревьям
+        converted_params.setdefault('oob_score', True)
     ModelClass = AVAILABLE_MODELS[model_type]['class']
     model = ModelClass(**converted_params)
-    model.fit(X, y)
-    y_pred = model.predict(X)
-    metrics = calculate_metrics(y, y_pred)
+    # Один раз переводим данные в ndarray, чтобы sklearn не конвертировал списки сам
+    X_arr = np.asarray(X, dtype=np.float32)
+    y_arr = np.asarray(y)
+    model.fit(X_arr, y_arr)
+    y_true, y_pred = y_arr, None
+    if getattr(model, 'oob_score', False):
+        oob = model.oob_decision_function_
+        # Объекты, ни разу не попавшие в out-of-bag, не имеют оценки: sklearn оставляет у них
+        # нулевую строку (у остальных вероятности в сумме дают 1)
+        covered = oob.sum(axis=1) > 0
+        if covered.any():
+            y_true = y_arr[covered]
+            y_pred = model.classes_[oob[covered].argmax(axis=1)]
+    if y_pred is None:
+        y_pred = model.predict(X_arr)
+    metrics = calculate_metrics(y_true, y_pred)
     # Логирование в MLflow
     with mlflow.start_run() as run:
         mlflow.log_param("model_type", model_type)
         mlflow.log_params(converted_params)
         mlflow.log_metrics(metrics)
-        mlflow.sklearn.log_model(model, "model")
         run_id = run.info.run_id
         model_uri = f"runs:/{run_id}/model"
-        logger.info(f"Model logged to MLflow. Run ID: {run_id}")
+    # Сериализация и загрузка модели в S3 идут в фоне, в этом процессе модель сразу доступна из кэша
+    cache_model(model_uri, model)
+    future = MLFLOW_UPLOAD_POOL.submit(upload_model, run_id, model)
+    _pending_uploads[model_uri] = future
+    future.add_done_callback(lambda f: f.exception() is None and _pending_uploads.pop(model_uri, None))
+    logger.info("Model upload to MLflow started. Run ID: %s", run_id)
     return run_id, metrics, model_uri
 
+# Фоновая загрузка артефактов моделей в MLflow
+# Запись дольше этого срока в статусе uploading считается failed: загружавший процесс завершился,
+# не обновив статус. Отсчет от created_at - он проставляется при создании и замене записи, когда загрузка уже идет
+MODEL_UPLOAD_TIMEOUT = timedelta(seconds=int(os.getenv("MODEL_UPLOAD_TIMEOUT", "600")))
+MLFLOW_UPLOAD_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='mlflow-upload')
+# model_uri -> Future загрузки; успешные загрузки удаляются сразу, неудачные забирает track_upload_status
+_pending_uploads: Dict[str, Future] = {}
+
+def upload_model(run_id: str, model: Any) -> None:
+    """Логирует модель в уже созданный MLflow run"""
+    with mlflow.start_run(run_id=run_id):
+        mlflow.sklearn.log_model(model, "model")
+    logger.info("Model logged to MLflow. Run ID: %s", run_id)
+
+def track_upload_status(app: Flask, model_uri: str) -> None:
+    """Проставляет статус записи модели (ready/failed), когда фоновая загрузка завершится"""
+    def update_status(error: Optional[BaseException]) -> None:
+        if error is not None:
+            logger.error("Model upload to MLflow failed: %s, %s", model_uri, error)
+        with app.app_context():
+            db.session.execute(
+                db.update(MLModel)
+                .where(MLModel.file_path == model_uri)
+                .values(status='failed' if error else 'ready')
+            )
+            db.session.commit()
+
+    future = _pending_uploads.pop(model_uri, None)
+    if future is None:
+        update_status(None)
+    else:
+        future.add_done_callback(lambda f: update_status(f.exception()))
+
+# Кэш загруженных моделей: model_uri -> estimator (LRU)
+MODEL_CACHE_SIZE = 32
+_model_cache: "OrderedDict[str, Any]" = OrderedDict()
+_model_cache_lock = threading.Lock()
+
+# model_uri -> lock загрузки, удаляется после загрузки
+_load_locks: Dict[str, threading.Lock] = {}
+
+def cache_model(model_uri: str, model: Any) -> None:
+    """Кладет модель в кэш загруженных моделей"""
+    with _model_cache_lock:
+        _model_cache[model_uri] = model
+        _model_cache.move_to_end(model_uri)
+        if len(_model_cache) > MODEL_CACHE_SIZE:
+            _model_cache.popitem(last=False)
+
+def get_cached_model(model_uri: str) -> Optional[Any]:
+    """Возвращает модель из кэша в памяти процесса или None, ничего не загружая"""
+    with _model_cache_lock:
+        model = _model_cache.get(model_uri)
+        if model is not None:
+            _model_cache.move_to_end(model_uri)
+        return model
+
 def load_model_from_mlflow(model_uri: str) -> Any:
-    """Загружает модель из MLflow (S3)"""
-    logger.info(f"Loading model from URI: {model_uri}")
-    model = mlflow.sklearn.load_model(model_uri)
-    return model
+    """
+    Загружает модель из MLflow (S3), повторные вызовы берут модель из кэша в памяти.
+    Если модели нет в кэше, вызывать только для записей со статусом ready:
+    пока артефакт загружается, его нет в MLflow
+    """
+    with _model_cache_lock:
+        model = _model_cache.get(model_uri)
+        if model is not None:
+            _model_cache.move_to_end(model_uri)
+            return model
+        load_lock = _load_locks.setdefault(model_uri, threading.Lock())
+    # Одну и ту же модель загружает только один поток, остальные ждут и берут её из кэша
+    with load_lock:
+        with _model_cache_lock:
+            model = _model_cache.get(model_uri)
+        if model is not None:
+            return model
+        try:
+            logger.info("Loading model from URI: %s", model_uri)
+            model = mlflow.sklearn.load_model(model_uri)
+            cache_model(model_uri, model)
+            return model
+        finally:
+            # Ждущие потоки уже держат ссылку на lock, новым вызовам он не нужен
+            with _model_cache_lock:
+                if _load_locks.get(model_uri) is load_lock:
+                    del _load_locks[model_uri]
+
+def evict_model(model_uri: str) -> None:
+    """Удаляет модель из кэша загруженных моделей"""
+    with _model_cache_lock:
+        _model_cache.pop(model_uri, None)
+        _load_locks.pop(model_uri, None)
+
+def lookup_model(model_id: str) -> Tuple[str, str, Dict[str, Any], str]:
+    """
+    Возвращает (file_path, model_type, params, status) модели по ID, если модели нет - бросает KeyError.
+    Запись всегда читается из БД: ее могут удалить или переобучить другой процесс
+    (воркер gunicorn, gRPC сервер, Celery), а кэш в памяти процесса этого не увидит.
+    Дорогая часть - загрузка самой модели - кэшируется по model_uri, который у run не меняется
+    """
+    record = db.session.get(MLModel, model_id)
+    if record is None:
+        raise KeyError(model_id)
+    result = (record.file_path, record.model_type, record.params)
+    status = record.status
+    # Зависшая загрузка: иначе модель навсегда отвечала бы 503
+    if status == 'uploading' and record.created_at and datetime.now() - record.created_at > MODEL_UPLOAD_TIMEOUT:
+        logger.warning("Model %s has been uploading since %s, marking it as failed", model_id, record.created_at)
+        status = 'failed'
+        db.session.execute(
+            db.update(MLModel)
+            .where(MLModel.id == model_id, MLModel.status == 'uploading')
+            .values(status=status)
+        )
+        db.session.commit()
+    return (*result, status)
 
 def create_model_record(
     model_id: str, 
@@ -150,8 +337,8 @@ def create_model_record(
     metrics: Dict[str, float]
 ) -> MLModel:
     """Создает запись модели в БД"""
-    logger.info(f"Creating model record: ID={model_id}, Type={model_type}")
-    logger.debug(f"Model params: {params}, Metrics: {metrics}")
+    logger.info("Creating model record: ID=%s, Type=%s", model_id, model_type)
+    logger.debug("Model params: %s, Metrics: %s", params, metrics)
     
     record = MLModel(
         id=model_id,
@@ -159,7 +346,23 @@ def create_model_record(
         params=params,
         file_path=file_path, 
         created_at=datetime.now(),
-        metrics=metrics
+        metrics=metrics,
+        status='uploading'
+    )
+    logger.debug("Model record created successfully: %s", model_id)
+    return record
+
+def replace_model_record(
+    model_id: str, 
+    new_model_id: str, 
+    file_path: str, 
+    metrics: Dict[str, float]
+) -> None:
+    """Заменяет запись модели новой версией после переобучения одним UPDATE"""
+    logger.info("Replacing model record: %s -> %s", model_id, new_model_id)
+    db.session.execute(
+        db.update(MLModel)
+        .where(MLModel.id == model_id)
+        .values(id=new_model_id, file_path=file_path, metrics=metrics, created_at=datetime.now(), status='uploading')
+        .execution_options(synchronize_session=False)
     )
-    logger.debug(f"Model record created successfully: {model_id}")
-    return record
\ No newline at end of file
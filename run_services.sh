@@ -2,15 +2,30 @@
 set -euo pipefail
 # неактуально для докера
 # ==================================================
-# Run both Flask REST API (port 5000)
+# Run Redis, Celery worker, Flask REST API (port 5000)
 # and gRPC server (port 50051) in background
 # ==================================================
 
 LOG_DIR="./logs"
 mkdir -p "${LOG_DIR}"
+export REDIS_URL="${REDIS_URL:-redis://localhost:6379/0}"
 
-echo "Запуск REST API (Flask) на порту 5000..."
-nohup python -u app.py > "${LOG_DIR}/flask.log" 2>&1 &
+# Обучение идет через Celery: без брокера и воркера задачи навсегда останутся в PENDING
+REDIS_PID=""
+if redis-cli -u "${REDIS_URL}" ping > /dev/null 2>&1; then
+    echo "Redis уже запущен (${REDIS_URL})"
+else
+    echo "Запуск Redis (порт 6379)..."
+    nohup redis-server --port 6379 > "${LOG_DIR}/redis.log" 2>&1 &
+    REDIS_PID=$!
+fi
+
+echo "Запуск Celery воркера..."
+nohup celery -A tasks.celery_app worker --loglevel=info > "${LOG_DIR}/celery_worker.log" 2>&1 &
+CELERY_PID=$!
+
+echo "Запуск REST API (Flask под gunicorn) на порту 5000..."
+nohup gunicorn app:app > "${LOG_DIR}/flask.log" 2>&1 &
 FLASK_PID=$!
 
 echo "Запуск gRPC сервера (порт 50051)..."
@@ -22,19 +37,22 @@ nohup streamlit run dashboard.py --server.port 8501 --server.headless true > "${
 STREAMLIT_PID=$!
 
 echo ""
+echo "Celery воркер запущен (PID=${CELERY_PID}) — брокер ${REDIS_URL}"
 echo "REST API запущен (PID=${FLASK_PID}) — http://localhost:5000"
 echo "gRPC сервер запущен (PID=${GRPC_PID}) — порт 50051"
 echo "Dashboard запущен (PID=${STREAMLIT_PID}) — http://localhost:8501"
 echo ""
 echo "Логи:"
+echo "   ${LOG_DIR}/celery_worker.log"
 echo "   ${LOG_DIR}/flask.log"
 echo "   ${LOG_DIR}/grpc_server.log" 
 echo "   ${LOG_DIR}/streamlit.log"
 echo ""
 echo "Чтобы остановить сервисы: нажмите Ctrl+C"
 
-# Обрабатываем Ctrl+C, чтобы корректно завершить оба процесса
-trap "echo 'Останавливаем сервисы...'; kill ${FLASK_PID} ${GRPC_PID}; wait ${FLASK_PID} ${GRPC_PID} 2>/dev/null; echo 'Готово'; exit 0" SIGINT SIGTERM
+# Обрабатываем Ctrl+C, чтобы корректно завершить все процессы
+PIDS="${FLASK_PID} ${GRPC_PID} ${CELERY_PID} ${REDIS_PID}"
+trap "echo 'Останавливаем сервисы...'; kill ${PIDS}; wait ${PIDS} 2>/dev/null; echo 'Готово'; exit 0" SIGINT SIGTERM
 
 # Ждём завершения процессов
-wait ${FLASK_PID} ${GRPC_PID}
+wait ${FLASK_PID} ${GRPC_PID} ${CELERY_PID}
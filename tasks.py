@@ -0,0 +1,82 @@
+import os
+import logging
+from typing import Any, Dict, List, Union
+
+from celery import Celery, Task
+from flask import Flask
+from models import db, init_db, MLModel, ENGINE_OPTIONS, create_model_record, replace_model_record, train_and_log_model, track_upload_status
+
+# Настройка логгера для Celery воркеров
+logger = logging.getLogger('tasks')
+logger.setLevel(logging.INFO)
+
+# Отдельное Flask приложение нужно только ради app_context для db.session
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = ENGINE_OPTIONS
+init_db(app)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+class ContextTask(Task):
+    """Запускает задачу внутри app_context, чтобы в воркере был доступен db.session"""
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        with app.app_context():
+            return self.run(*args, **kwargs)
+
+
+celery_app = Celery(
+    'mlops',
+    broker=REDIS_URL,
+    backend=os.getenv("CELERY_RESULT_BACKEND", REDIS_URL),
+    task_cls=ContextTask,
+)
+celery_app.conf.update(
+    task_serializer='json',
+    result_serializer='json',
+    accept_content=['json'],
+    task_track_started=True,
+    # В k8s у каждого пода своя SQLite база, поэтому задачи пода обрабатывает его собственный воркер
+    task_default_queue=os.getenv("CELERY_QUEUE", "celery"),
+)
+
+
+@celery_app.task(bind=True)
+def train_task(
+    self: Task,
+    model_type: str,
+    params: Dict[str, Any],
+    X: List[List[float]],
+    y: List[Union[int, float]]
+) -> Dict[str, Any]:
+    """Обучает модель в воркере и сохраняет запись в БД"""
+    logger.info("Job %s: training %s with %d samples", self.request.id, model_type, len(X))
+    run_id, metrics, model_uri = train_and_log_model(model_type, params, X, y)
+    record = create_model_record(run_id, model_type, params, model_uri, metrics)
+    db.session.add(record)
+    db.session.commit()
+    track_upload_status(app, model_uri)
+    logger.info("Job %s: model trained. ID: %s, Metrics: %s", self.request.id, run_id, metrics)
+    return {'model_id': run_id, 'metrics': metrics}
+
+
+@celery_app.task(bind=True)
+def retrain_task(
+    self: Task,
+    model_id: str,
+    X: List[List[float]],
+    y: List[Union[int, float]]
+) -> Dict[str, Any]:
+    """Переобучает существующую модель в воркере и заменяет её запись в БД"""
+    logger.info("Job %s: retraining model %s", self.request.id, model_id)
+    record = db.session.get(MLModel, model_id)
+    if not record:
+        raise ValueError(f"Model not found: {model_id}")
+    new_run_id, metrics, new_model_uri = train_and_log_model(record.model_type, record.params, X, y)
+    replace_model_record(model_id, new_run_id, new_model_uri, metrics)
+    db.session.commit()
+    track_upload_status(app, new_model_uri)
+    logger.info("Job %s: model retrained. Old ID: %s, New ID: %s", self.request.id, model_id, new_run_id)
+    return {'status': 'retrained', 'new_model_id': new_run_id, 'metrics': metrics}
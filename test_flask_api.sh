@@ -1,6 +1,8 @@
 #!/bin/bash
 
 BASE_URL="http://localhost:5000"
+# Сколько секунд ждать завершения задачи обучения
+JOB_TIMEOUT=${JOB_TIMEOUT:-300}
 MODEL_ID_FILE="/tmp/test_model_id.txt"
 
 echo "Запуск тестирования работоспособности Flask API"
@@ -38,8 +40,64 @@ RESPONSE=$(curl -s -X POST "$BASE_URL/models/train" \
 echo "Ответ сервера:"
 echo "$RESPONSE" | python -m json.tool || echo "$RESPONSE"
 
-# Пытаемся извлечь ID
-MODEL_ID=$(echo "$RESPONSE" | python -c "import sys, json; print(json.load(sys.stdin).get('model_id', ''))" 2>/dev/null)
+# Обучение выполняется в фоне, поэтому извлекаем ID задачи
+JOB_ID=$(echo "$RESPONSE" | python -c "import sys, json; print(json.load(sys.stdin).get('job_id', ''))" 2>/dev/null)
+
+if [ -z "$JOB_ID" ]; then
+    echo "ОШИБКА: Не удалось получить job_id. Обучение не запущено."
+    echo "Скрипт остановлен."
+    exit 1
+fi
+
+# Ждем завершения задачи обучения
+wait_for_job() {
+    local job_id=$1
+    local status=""
+    local waited=0
+    while true; do
+        JOB_RESPONSE=$(curl -s "$BASE_URL/jobs/$job_id")
+        status=$(echo "$JOB_RESPONSE" | python -c "import sys, json; print(json.load(sys.stdin)['status'])")
+        if [ "$status" = "SUCCESS" ] || [ "$status" = "FAILURE" ]; then
+            break
+        fi
+        if [ "$waited" -ge "$JOB_TIMEOUT" ]; then
+            echo "ОШИБКА: задача $job_id не завершилась за ${JOB_TIMEOUT} сек (статус: $status). Запущены ли Redis и Celery воркер?"
+            break
+        fi
+        sleep 1
+        waited=$((waited + 1))
+    done
+    echo "$JOB_RESPONSE" | python -m json.tool
+}
+
+# Артефакт модели загружается в MLflow в фоне: до статуса ready предсказание отвечает 503
+wait_for_model_ready() {
+    local model_id=$1
+    local status=""
+    local waited=0
+    while true; do
+        status=$(curl -s "$BASE_URL/models/$model_id" | python -c "import sys, json; print(json.load(sys.stdin).get('status', ''))")
+        if [ "$status" = "ready" ]; then
+            break
+        fi
+        if [ "$status" = "failed" ]; then
+            echo "ОШИБКА: загрузка модели $model_id в MLflow не удалась."
+            exit 1
+        fi
+        if [ "$waited" -ge "$JOB_TIMEOUT" ]; then
+            echo "ОШИБКА: модель $model_id не загрузилась за ${JOB_TIMEOUT} сек (статус: $status)."
+            exit 1
+        fi
+        sleep 1
+        waited=$((waited + 1))
+    done
+    echo "Модель $model_id загружена в MLflow (status: ready)"
+}
+
+echo "Ожидание завершения задачи: $JOB_ID"
+wait_for_job "$JOB_ID"
+
+MODEL_ID=$(echo "$JOB_RESPONSE" | python -c "import sys, json; print((json.load(sys.stdin).get('result') or {}).get('model_id', ''))" 2>/dev/null)
 
 if [ -z "$MODEL_ID" ]; then
     echo "ОШИБКА: Не удалось получить model_id. Обучение не прошло."
@@ -50,11 +108,6 @@ fi
 echo "$MODEL_ID" > $MODEL_ID_FILE
 echo "Model ID сохранен: $MODEL_ID"
 
-# Извлекаем model_id
-MODEL_ID=$(echo "$RESPONSE" | python -c "import sys, json; print(json.load(sys.stdin)['model_id'])")
-echo "$MODEL_ID" > $MODEL_ID_FILE
-echo "Model ID сохранен: $MODEL_ID"
-
 # 4. Просмотр всех моделей
 print_step 4 "Просмотр всех моделей"
 curl -s "$BASE_URL/models" | python -m json.tool
@@ -67,6 +120,7 @@ echo ""
 
 # 6. Получение предсказаний
 print_step 6 "Получение предсказаний"
+wait_for_model_ready "$MODEL_ID"
 curl -s -X POST "$BASE_URL/models/$MODEL_ID/predict" \
     -H "Content-Type: application/json" \
     -d '{"X": [[5.1,3.5,1.4,0.2],[4.9,3.0,1.4,0.2]]}' | python -m json.tool
@@ -74,9 +128,13 @@ echo ""
 
 # 7. Переобучение модели
 print_step 7 "Переобучение модели"
-curl -s -X POST "$BASE_URL/models/$MODEL_ID/retrain" \
+RETRAIN_RESPONSE=$(curl -s -X POST "$BASE_URL/models/$MODEL_ID/retrain" \
     -H "Content-Type: application/json" \
-    -d '{"X": [[5.1,3.5,1.4,0.2],[4.9,3.0,1.4,0.2]], "y": [1,1]}' | python -m json.tool
+    -d '{"X": [[5.1,3.5,1.4,0.2],[4.9,3.0,1.4,0.2]], "y": [1,1]}')
+echo "$RETRAIN_RESPONSE" | python -m json.tool
+RETRAIN_JOB_ID=$(echo "$RETRAIN_RESPONSE" | python -c "import sys, json; print(json.load(sys.stdin)['job_id'])")
+wait_for_job "$RETRAIN_JOB_ID"
+MODEL_ID=$(echo "$JOB_RESPONSE" | python -c "import sys, json; print(json.load(sys.stdin)['result']['new_model_id'])")
 echo ""
 
 # 8. Удаление тестовой модели
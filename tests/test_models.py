@@ -1,6 +1,22 @@
 import pytest
 from unittest.mock import MagicMock, patch
-from models import train_and_log_model, convert_params
+from models import train_and_log_model, convert_params, calculate_metrics, get_cached_model, _pending_uploads
+
+
+@pytest.fixture
+def db_app():
+    """
+    Flask приложение с пустой SQLite базой в памяти, тест выполняется внутри его app_context.
+    """
+    from flask import Flask
+    from models import db
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
 
 # ==========================================
 # ТЕСТ А: Unit-тест 
@@ -28,6 +44,24 @@ def test_convert_params_logic():
     assert isinstance(real_result["n_estimators"], int)
     assert isinstance(real_result["learning_rate"], float)
 
+
+def test_convert_params_signed_and_exponent():
+    """
+    Отрицательные числа остаются int, экспонента и точка дают float.
+    """
+    real_result = convert_params({"max_depth": "-1", "tol": "1e-4", "C": "-0.5", "penalty": "l2"})
+    assert real_result == {"max_depth": -1, "tol": 1e-4, "C": -0.5, "penalty": "l2"}
+    assert isinstance(real_result["max_depth"], int)
+
+
+def test_convert_params_matches_builtin_number_syntax():
+    """
+    Знак "+", пробелы по краям и "_" между цифрами разбираются так же, как int()/float().
+    """
+    real_result = convert_params({"n_estimators": "+1", "max_depth": " 3", "max_iter": "1_000", "C": " +1_0.5e-1 ", "solver": "nan"})
+    assert real_result == {"n_estimators": 1, "max_depth": 3, "max_iter": 1000, "C": 1.05, "solver": "nan"}
+    assert isinstance(real_result["max_iter"], int)
+
 # ==========================================
 # ТЕСТ Б: Тест с Моком (Имитация S3/MLflow)
 # ==========================================
@@ -61,4 +95,175 @@ def test_train_and_log_model_mocked(mock_mlflow):
     assert "recall" in metrics
     mock_mlflow.log_params.assert_called()       # Были ли записаны параметры?
     mock_mlflow.log_metrics.assert_called()      # Были ли записаны метрики?
-    mock_mlflow.sklearn.log_model.assert_called() # Была ли попытка сохранить модель?
\ No newline at end of file
+    assert get_cached_model(model_uri) is not None # До окончания загрузки модель доступна из кэша
+    future = _pending_uploads.get(model_uri)      # Модель загружается в фоне
+    if future is not None:                        # (успешная загрузка сразу удаляется из _pending_uploads)
+        future.result()
+    mock_mlflow.sklearn.log_model.assert_called() # Была ли попытка сохранить модель?
+
+# ==========================================
+# ТЕСТ Б2: Метрики случайного леса по out-of-bag
+# ==========================================
+OOB_X = [[0, 0], [0, 1], [5, 5], [5, 6]]
+OOB_Y = [1, 1, 2, 2]
+
+
+@patch("models.calculate_metrics", wraps=calculate_metrics)
+@patch("models.mlflow")
+def test_oob_metrics_skip_uncovered_samples(mock_mlflow, spy_metrics):
+    """
+    Объекты без out-of-bag оценки не попадают в метрики (а не считаются классом classes_[0]).
+    """
+    # 2 дерева на 4 объектах: объекты 0 и 3 попали в бутстрэп обоих деревьев
+    _, metrics, _ = train_and_log_model("random_forest", {"n_estimators": "2", "random_state": "0"}, OOB_X, OOB_Y)
+    y_true, _ = spy_metrics.call_args.args
+    assert list(y_true) == [1, 2]
+    assert metrics["accuracy"] == 1.0
+
+
+@patch("models.calculate_metrics", wraps=calculate_metrics)
+@patch("models.mlflow")
+def test_oob_metrics_fall_back_to_predict(mock_mlflow, spy_metrics):
+    """
+    Если out-of-bag оценки нет ни у одного объекта, метрики считаются по predict на всей выборке.
+    """
+    # С random_state=12 единственное дерево видит в бутстрэпе все 4 объекта
+    _, metrics, _ = train_and_log_model("random_forest", {"n_estimators": "1", "random_state": "12"}, OOB_X, OOB_Y)
+    y_true, _ = spy_metrics.call_args.args
+    assert list(y_true) == OOB_Y
+    assert metrics["accuracy"] == 1.0
+
+
+# ==========================================
+# ТЕСТ В: Поиск модели по ID
+# ==========================================
+def test_lookup_model(db_app):
+    """
+    Проверяем, что lookup_model находит модель и сразу видит ее удаление.
+    """
+    from models import db, MLModel, create_model_record, lookup_model
+
+    # Модели еще нет - KeyError
+    with pytest.raises(KeyError):
+        lookup_model("run_1")
+
+    record = create_model_record("run_1", "random_forest", {"n_estimators": 10}, "runs:/run_1/model", {})
+    db.session.add(record)
+    db.session.commit()
+    assert lookup_model("run_1") == ("runs:/run_1/model", "random_forest", {"n_estimators": 10}, "uploading")
+
+    # Удаленная модель больше не находится
+    db.session.delete(db.session.get(MLModel, "run_1"))
+    db.session.commit()
+    with pytest.raises(KeyError):
+        lookup_model("run_1")
+
+
+# ==========================================
+# ТЕСТ Г: Кэш загруженных моделей
+# ==========================================
+@patch("models.mlflow")
+def test_load_model_from_mlflow_cached(mock_mlflow):
+    """
+    Проверяем, что модель скачивается из MLflow один раз, а после evict_model - заново.
+    """
+    from models import load_model_from_mlflow, evict_model
+
+    uri = "runs:/cached_run/model"
+    evict_model(uri)
+    first = load_model_from_mlflow(uri)
+    second = load_model_from_mlflow(uri)
+    assert first is second
+    mock_mlflow.sklearn.load_model.assert_called_once_with(uri)
+
+    evict_model(uri)
+    load_model_from_mlflow(uri)
+    assert mock_mlflow.sklearn.load_model.call_count == 2
+    evict_model(uri)
+
+
+# ==========================================
+# ТЕСТ Г2: Статус после неудачной фоновой загрузки
+# ==========================================
+@patch("models.mlflow")
+def test_failed_upload_marks_record_failed(mock_mlflow, db_app):
+    """
+    Если загрузка в MLflow упала, запись получает статус failed, а Future загрузки не остается в памяти.
+    """
+    from concurrent.futures import wait
+    from models import db, MLModel, create_model_record, track_upload_status
+
+    mock_mlflow.start_run.return_value.__enter__.return_value.info.run_id = "failed_run"
+    mock_mlflow.sklearn.log_model.side_effect = RuntimeError("S3 is down")
+    run_id, metrics, model_uri = train_and_log_model("logistic_regression", {}, [[0, 0], [1, 1]], [0, 1])
+    wait([_pending_uploads[model_uri]])
+
+    db.session.add(create_model_record(run_id, "logistic_regression", {}, model_uri, metrics))
+    db.session.commit()
+    track_upload_status(db_app, model_uri)
+
+    assert model_uri not in _pending_uploads
+    assert db.session.get(MLModel, run_id).status == 'failed'
+
+
+# ==========================================
+# ТЕСТ Г3: Зависшая загрузка
+# ==========================================
+def test_stale_upload_is_marked_failed(db_app):
+    """
+    Запись, которая дольше MODEL_UPLOAD_TIMEOUT остается в статусе uploading, считается failed.
+    """
+    from models import db, MLModel, MODEL_UPLOAD_TIMEOUT, create_model_record, lookup_model
+
+    fresh = create_model_record("fresh_run", "random_forest", {}, "runs:/fresh_run/model", {})
+    stale = create_model_record("stale_run", "random_forest", {}, "runs:/stale_run/model", {})
+    stale.created_at -= MODEL_UPLOAD_TIMEOUT * 2
+    db.session.add_all([fresh, stale])
+    db.session.commit()
+
+    assert lookup_model("fresh_run")[3] == 'uploading'
+    assert lookup_model("stale_run")[3] == 'failed'
+    assert db.session.get(MLModel, "stale_run").status == 'failed'
+
+
+# ==========================================
+# ТЕСТ Д: Замена записи при переобучении
+# ==========================================
+def test_replace_model_record(db_app):
+    """
+    Проверяем, что после переобучения старая запись заменяется новой версией.
+    """
+    from models import db, MLModel, create_model_record, replace_model_record
+
+    record = create_model_record("old_run", "random_forest", {"n_estimators": 10}, "runs:/old_run/model", {"accuracy": 0.5})
+    db.session.add(record)
+    db.session.commit()
+
+    replace_model_record("old_run", "new_run", "runs:/new_run/model", {"accuracy": 0.9})
+    db.session.commit()
+
+    assert db.session.get(MLModel, "old_run") is None
+    new_record = db.session.get(MLModel, "new_run")
+    assert new_record.file_path == "runs:/new_run/model"
+    assert new_record.params == {"n_estimators": 10}
+    assert new_record.metrics == {"accuracy": 0.9}
+
+
+# ==========================================
+# ТЕСТ Е: Метрики по матрице ошибок
+# ==========================================
+def test_calculate_metrics_matches_sklearn():
+    """
+    Метрики из матрицы ошибок совпадают с accuracy/precision/recall из sklearn,
+    в том числе когда один из классов ни разу не предсказан.
+    """
+    from sklearn.metrics import accuracy_score, precision_score, recall_score
+    from models import calculate_metrics
+
+    y_true = [0, 1, 2, 2, 1, 0, 2, 1, 3]
+    y_pred = [0, 2, 2, 2, 1, 0, 1, 1, 2]
+    metrics = calculate_metrics(y_true, y_pred)
+
+    assert metrics["accuracy"] == pytest.approx(accuracy_score(y_true, y_pred))
+    assert metrics["precision"] == pytest.approx(precision_score(y_true, y_pred, average="weighted", zero_division=0))
+    assert metrics["recall"] == pytest.approx(recall_score(y_true, y_pred, average="weighted", zero_division=0))